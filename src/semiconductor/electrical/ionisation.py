@@ -2,10 +2,10 @@
 # UTF-8
 
 import numpy as np
-import matplotlib.pylab as plt
 import os
 
-from semiconductor.helper.helper import BaseModelClass
+from semiconductor.helper.helper import BaseModelClass, get_pyplot
+from semiconductor.helper import diagnostics
 from . import impurity_ionisation_models as IIm
 from semiconductor.material.densityofstates import DOS
 from semiconductor.general_functions import carrierfunctions
@@ -43,6 +43,10 @@ class Ionisation(BaseModelClass):
 
     author_list = 'ionisation.yaml'
 
+    # below this temperature, in Kelvin, the fixed point iteration
+    # contracts slowly and is accelerated by default
+    _acceleration_temp = 200.
+
     def __init__(self, **kwargs):
 
         # update any values in cal_dts
@@ -115,32 +119,59 @@ class Ionisation(BaseModelClass):
             # multiply it by the number of dopants
             iN_imp *= self._cal_dts['N_imp']
         else:
-            print('''\nWarning:\n\t'''
-                  '''No such impurity, please check your model'''
-                  '''and spelling.\n\tReturning zero array\n''')
+            diagnostics.warn('No such impurity %s, please check your model '
+                             'and spelling. Returning zero array',
+                             self._cal_dts['impurity'],
+                             key='ionisation impurity')
             iN_imp = np.zeros(np.asarray(
                 self._cal_dts['N_imp']).flatten().shape[0])
 
         return iN_imp
 
-    def update_dopant_ionisation(self, N_dop, nxc, impurity, **kwargs):
+    def update_dopant_ionisation(self, N_dop, nxc, impurity, tol=1e-6,
+                                 max_iter=100, acceleration=None,
+                                 full_output=False, **kwargs):
         '''
         This is a special function used to determine the number of
         ionised dopants given a number of excess carriers, and a
         single dopant type.
 
+        The ionised dopants and carriers are found self consistently by a
+        fixed point iteration. Each element stops iterating once its
+        estimated relative error is below tol, so only the unconverged
+        elements are recalculated. The error is estimated from the
+        residual of the ionisation equation, f = g(x) - x, and its slope
+        between the last two iterates as |f / f'|, so a slowly contracting
+        iteration is not taken to have converged just because its steps
+        are small.
+
         inputs:
-            N_dop: (float; |cm-3|)
+            N_dop: (float or array like; |cm-3|)
                 The dopant density
-            nxc: (float; |cm-3|)
+            nxc: (float or array like; |cm-3|)
                 The excess carrier density
             impurity: (str)
                 The name of the dopant used e.g. boron, phosphorous. The
                 dopants available depend on the model used
+            tol: (float, optional)
+                The estimated relative error in ionised dopants at which an
+                element is considered converged
+            max_iter: (int, optional)
+                The maximum number of iterations for any element
+            acceleration: (bool, optional)
+                If True depth one Anderson mixing is applied, which for
+                each element is the secant update of the fixed point.
+                This helps heavily doped or cryogenic points. If not
+                provided it is used below 200 K.
+            full_output: (bool, optional)
+                If True a dictionary with the iterations used, the final
+                relative residual, the estimated relative error and if each
+                element converged is also returned
 
         output:
             N_idop: (float cm^-2)
                 The number of ionised dopants
+            info: (dict, only if full_output is True)
         '''
 
         self.calculationdetails = kwargs
@@ -149,44 +180,117 @@ class Ionisation(BaseModelClass):
         if 'author' in kwargs.keys():
             self.change_model(self._cal_dts['author'])
 
-        if not isinstance(N_dop, np.ndarray):
-            N_dop = np.asarray([N_dop])
+        N_dop, nxc = np.broadcast_arrays(
+            np.atleast_1d(np.asarray(N_dop, dtype=float)),
+            np.asarray(nxc, dtype=float))
+        shape = N_dop.shape
+        N_dop = N_dop.flatten()
+        nxc = nxc.flatten()
+
+        if acceleration is None:
+            acceleration = np.all(
+                np.asarray(self._cal_dts['temp']) < self._acceleration_temp)
 
         N_idop = np.copy(N_dop)
+        iterations = np.zeros(N_dop.shape, dtype=int)
+        residual = np.zeros(N_dop.shape)
+        error = np.zeros(N_dop.shape)
 
         if impurity in self.vals.keys():
-            # TO DO, change this from just running 10 times to a proper check
-            for i in range(10):
-                if self.vals['tpe_' + self.vals[impurity]] == 'donor':
-                    Nd = np.copy(N_idop)
-                    Na = np.zeros(Nd.shape)
-                elif self.vals['tpe_' + self.vals[impurity]] == 'acceptor':
-                    Na = np.copy(N_idop)
-                    Nd = np.zeros(Na.shape)
+            dopant_type = self.vals['tpe_' + self.vals[impurity]]
+            if dopant_type not in ['donor', 'acceptor']:
+                raise ValueError(
+                    'unknown dopant type {0} in the ionisation model'.format(
+                        dopant_type))
+
+            active = np.arange(N_dop.shape[0])
+            x_prev = f_prev = None
+
+            for i in range(max_iter):
+                x = N_idop[active]
+                g = self._ionised_dopants(
+                    x, N_dop[active], nxc[active], dopant_type, impurity)
+                f = g - x
+
+                residual[active] = np.abs(f) / N_dop[active]
+                iterations[active] += 1
+
+                # the distance to the root, which needs the slope of f, so
+                # only an exact solution can converge on the first step
+                if f_prev is None:
+                    error[active] = np.where(f == 0, 0., np.inf)
                 else:
-                    print('something went wrong in ionisation model')
+                    with np.errstate(divide='ignore', invalid='ignore'):
+                        slope = (f - f_prev) / (x - x_prev)
+                        error[active] = np.where(
+                            x != x_prev, np.abs(f / slope), np.abs(f)) / x
+
+                x_new = g
+                if acceleration and x_prev is not None:
+                    # the secant update of the fixed point
+                    df = f - f_prev
+                    change = df != 0
+                    x_new = np.copy(g)
+                    x_new[change] = x[change] - f[change] * \
+                        (x[change] - x_prev[change]) / df[change]
+                    x_new = np.clip(x_new, 0, N_dop[active])
+
+                N_idop[active] = x_new
+
+                # drop the elements that have converged
+                keep = error[active] >= tol
+                active = active[keep]
+                x_prev, f_prev = x[keep], f[keep]
+
+                if not active.size:
+                    break
 
-                ne, nh = CF.get_carriers(
-                    Na,
-                    Nd,
-                    nxc,
-                    temp=self._cal_dts['temp'],
-                    material=self._cal_dts['material'],
-                    ni_author=self._cal_dts['ni_author'])
+        else:
+            diagnostics.warn('Not a valid impurity %s, returning 100%% '
+                             'ionisation', impurity,
+                             key='ionisation dopant impurity')
 
-                N_idop = self.update(
-                    N_imp=N_dop, ne=ne, nh=nh, impurity=impurity)
+        N_idop = N_idop.reshape(shape)
 
-        else:
-            print(r'Not a valid impurity, returning 100% ionisation')
+        if full_output:
+            info = {
+                'iterations': iterations.reshape(shape),
+                'residual': residual.reshape(shape),
+                'error': error.reshape(shape),
+                'converged': (error < tol).reshape(shape),
+            }
+            return N_idop, info
 
         return N_idop
 
+    def _ionised_dopants(self, N_idop, N_dop, nxc, dopant_type, impurity):
+        '''
+        a single step of the fixed point iteration, returning the ionised
+        dopants given a guess of the ionised dopants
+        '''
+        if dopant_type == 'donor':
+            Nd = N_idop
+            Na = np.zeros(Nd.shape)
+        else:
+            Na = N_idop
+            Nd = np.zeros(Na.shape)
+
+        ne, nh = CF.get_carriers(
+            Na,
+            Nd,
+            nxc,
+            temp=self._cal_dts['temp'],
+            material=self._cal_dts['material'],
+            ni_author=self._cal_dts['ni_author'])
+
+        return self.update(N_imp=N_dop, ne=ne, nh=nh, impurity=impurity)
+
     def check_models(self):
         '''
         Plots a check of the modeled data against Digitised data from either
         papers or from other implementations of the model.
         '''
+        plt = get_pyplot()
         plt.figure('Ionised impurities')
 
         iN_imp = N_imp = np.logspace(15, 20)
@@ -3,7 +3,6 @@
 # encoding=utf8
 
 import numpy as np
-import matplotlib.pylab as plt
 import os
 
 try:
@@ -14,7 +13,7 @@ except:
 from . import mobilitymodels as model
 from semiconductor.general_functions.carrierfunctions import get_carriers
 
-from semiconductor.helper.helper import BaseModelClass
+from semiconductor.helper.helper import BaseModelClass, get_pyplot
 
 
 class Mobility(BaseModelClass):
@@ -130,11 +129,38 @@ class Mobility(BaseModelClass):
                 nxc=self._cal_dts['nxc'],
                 temp=self._cal_dts['temp'])
         else:
-            mob_sum = self.hole_mobility() +\
-                self.electron_mobility()
+            mob_e, mob_h = self.carrier_mobilities()
+            mob_sum = mob_h + mob_e
 
         return mob_sum
 
+    def carrier_mobilities(self, **kwargs):
+        '''
+        returns the electron and hole mobilities. If the model has a
+        kernel that calculates both carriers at once (named
+        <model>_carriers) it is used, otherwise each carrier is
+        calculated separately.
+
+        inputs:
+            kwargs: (optinal)
+                any value with _cal_dts, for which the mobility depends on
+
+        output:
+            The electron and hole mobilities cm^2 V^-1 s^-1
+        '''
+        if bool(kwargs):
+            self.calculationdetails = kwargs
+
+        if hasattr(model, self.model + '_carriers'):
+            mob_e, mob_h = getattr(model, self.model + '_carriers')(
+                self.vals, Na=self._cal_dts['Na'], Nd=self._cal_dts['Nd'],
+                nxc=self._cal_dts['nxc'], temp=self._cal_dts['temp'])
+        else:
+            mob_e = self.electron_mobility()
+            mob_h = self.hole_mobility()
+
+        return mob_e, mob_h
+
     def ambipolar(self, ni_author=None, **kwargs):
         '''
         returns the ambipolar mobility
@@ -162,8 +188,7 @@ class Mobility(BaseModelClass):
             ni_author=ni_author,
             ni=9e9)
 
-        mob_h = self.hole_mobility()
-        mob_e = self.electron_mobility()
+        mob_e, mob_h = self.carrier_mobilities()
 
         # caculate the ambipolar mobility according to
         mob_ambi = (ne + nh) / (nh / mob_e + ne / mob_h)
@@ -175,9 +200,45 @@ class Mobility(BaseModelClass):
         check_dorkel()
 
 
+def benchmark_carrier_mobilities(n=1000000, author='Klaassen_1992'):
+    '''
+    times the calculation of both carrier mobilities for n doping and
+    excess carrier values, calculating each carrier separately and both
+    carriers in a single pass.
+
+    output:
+        a dictionary of the run times in seconds and the speedup
+    '''
+    import time
+
+    Na = np.logspace(14, 19, n)
+    nxc = np.logspace(10, 17, n)[::-1]
+
+    mob = Mobility(author=author, Na=Na, Nd=0, nxc=nxc)
+
+    start = time.time()
+    separate = (mob.electron_mobility(), mob.hole_mobility())
+    time_separate = time.time() - start
+
+    start = time.time()
+    fused = mob.carrier_mobilities()
+    time_fused = time.time() - start
+
+    assert np.allclose(separate, fused, rtol=1e-12)
+
+    results = {'separate': time_separate,
+               'fused': time_fused,
+               'speedup': time_separate / time_fused}
+    print('{0} values: separate {1:.3f} s, fused {2:.3f} s, {3:.2f}x'.format(
+        n, time_separate, time_fused, results['speedup']))
+
+    return results
+
+
 # these checks should not be here, but rather be in the models class
 def check_klaassen():
     '''compares to values taken from www.PVlighthouse.com.au'''
+    plt = get_pyplot()
     a = Mobility('Si')
     a.change_model('klaassen1992')
 
@@ -225,6 +286,7 @@ def check_klaassen():
 
 def check_dorkel():
     '''compares to values taken from www.PVlighthouse.com.au'''
+    plt = get_pyplot()
 
     a = Mobility('Si')
     a.change_model(author='dorkel1981')
@@ -19,7 +19,7 @@ def dannhauser(vals, Na, Nd, nxc, **kwargs):
     return the sum of the carrier mobility
     This was taken from a Sinton Instruments excel work sheet from 2010
     '''
-    doping = np.amax([Na, Nd])
+    doping = np.maximum(Na, Nd)
     sum_mu = vals['mob_sum'] * (
         1. + 10**(vals['power'] * np.log10((nxc + doping) / vals['ni2'])
                   )) / (
@@ -71,14 +71,10 @@ def dorkel(vals, Na, Nd, nxc, temp, carrier, **kwargs):
                              temp=temp)
     # print Na, Nd, nxc, temp
 
-    if np.all(nh < ne):
-        nxc = nh
-        maj_car_den = ne
-    elif np.all(nh >= ne):
-        maj_car_den = nh
-        nxc = ne
-    else:
-        sys.exit("Mixed doping types not permitted")
+    # the majority and minority carriers are picked per element, so
+    # mixed doping types in one array are fine
+    nxc = np.minimum(ne, nh)
+    maj_car_den = np.maximum(ne, nh)
 
     # this relates the carrier to the extension in the variable name
     if carrier == 'electron':
@@ -86,7 +82,8 @@ def dorkel(vals, Na, Nd, nxc, temp, carrier, **kwargs):
     elif carrier == 'hole':
         carrier = 'h'
     else:
-        sys.exit("inappropriate values for carrier passed")
+        raise ValueError(
+            'inappropriate values for carrier passed: {0}'.format(carrier))
 
     # determine hole dependent carrier partial mobilities
     mu_L = lattice_mobility(vals, temp, carrier)
@@ -195,7 +192,8 @@ def unified_mobility(vals, Na, Nd, nxc, temp, carrier, **kwargs):
     if carrier in type_dic:
         carrier = type_dic[carrier]
     else:
-        print('incorrect input for carrier input')
+        raise ValueError(
+            'incorrect input for carrier input: {0}'.format(carrier))
 
     # Things to fix up
     # ni = ni
@@ -258,7 +256,8 @@ def unified_mobility_compensated(vals, Na, Nd, nxc, temp, carrier, **kwargs):
     if carrier in type_dic:
         carrier = type_dic[carrier]
     else:
-        print('incorrect input for carrier input')
+        raise ValueError(
+            'incorrect input for carrier input: {0}'.format(carrier))
 
     # Things to fix up
     # ni = ni
@@ -276,6 +275,75 @@ def unified_mobility_compensated(vals, Na, Nd, nxc, temp, carrier, **kwargs):
         1. / uLS(carrier, vals, temp))
 
 
+def unified_mobility_carriers(vals, Na, Nd, nxc, temp, **kwargs):
+    """
+    Klaassen's unified mobility model for both carriers in a single pass.
+
+    This gives the same values as calling unified_mobility for electrons
+    and then holes, but the carrier densities and the shared terms
+    (Z, Nsc, P, G, F, Nsceff) are only calculated once.
+
+    returns:
+        electron mobility (cm^2 V^-1 s^-1)
+        hole mobility (cm^2 V^-1 s^-1)
+    """
+    ne, nh = GF.get_carriers(Na=Na,
+                             Nd=Nd,
+                             nxc=nxc,
+                             temp=temp)
+
+    carrier_sum = ne + nh
+
+    # the clustered dopants, shared by both carriers
+    NdZ = return_dopant('e', Na, Nd) * Z('e', vals, Na, Nd)
+    NaZ = return_dopant('h', Na, Nd) * Z('h', vals, Na, Nd)
+
+    # the screening densities, each carrier is screened by the other
+    nsc = {'e': NdZ + NaZ + nh, 'h': NdZ + NaZ + ne}
+    opposite = {'e': nh, 'h': ne}
+    switch = {'e': 'h', 'h': 'e'}
+
+    mobility = []
+    for carrier in ['e', 'h']:
+        mr = vals['mr_' + carrier]
+        mr_ratio = mr / vals['mr_' + switch[carrier]]
+
+        pcw = 3.97e13 * (1. / nsc[carrier] * (temp / 300.)**3.)**(2. / 3.)
+        pbh = 1.36e20 / carrier_sum * (mr * (temp / 300.0)**2.0)
+        p = 1. / (vals['fcw'] / pcw + vals['fbh'] / pbh)
+
+        g = 1. - vals['s1'] / \
+            (vals['s2'] + (temp / 300. / mr) ** vals['s4'] * p)**vals['s3'] +\
+            vals['s5'] / ((300. / temp / mr)**vals['s7'] * p)**vals['s6']
+
+        p_r6 = p**vals['r6']
+        f = (vals['r1'] * p_r6 + vals['r2'] + vals['r3'] * mr_ratio) / (
+            p_r6 + vals['r4'] + vals['r5'] * mr_ratio)
+
+        if carrier == 'e':
+            nsceff = g * NaZ + NdZ + opposite[carrier] / f
+        else:
+            nsceff = NaZ + g * NdZ + opposite[carrier] / f
+
+        udcs = un(carrier, vals, temp) * nsc[carrier] / nsceff * (
+            vals['nref_' + carrier] / nsc[carrier]
+        )**(vals['alpha_' + carrier]) + \
+            uc(carrier, vals, temp) * carrier_sum / nsceff
+
+        mobility.append(1. / (1. / udcs + 1. / uLS(carrier, vals, temp)))
+
+    return mobility[0], mobility[1]
+
+
+def unified_mobility_compensated_carriers(vals, Na, Nd, nxc, temp, **kwargs):
+    """
+    Both carrier mobilities from unified_mobility_compensated in a single
+    pass. As unified_mobility_compensated evaluates the same expressions
+    as unified_mobility, this is the same calculation.
+    """
+    return unified_mobility_carriers(vals, Na, Nd, nxc, temp, **kwargs)
+
+
 def uLS(carrier, vals, temp):
 
     return vals['umax_' + carrier] * (300. / temp)**vals['theta_' + carrier]
@@ -310,8 +378,7 @@ def uDCS_compensated(carrier, vals, nh, ne, Na, Nd, temp):
 
     C_l = (Na + Nd) / (nh0 + ne0)
 
-    if C_l < 1:
-        C_l = 1
+    C_l = np.maximum(C_l, 1.)
 
     nsc = Nsc(carrier, vals, nh, ne, Na, Nd)
     nsceff = Nsceff(carrier, vals, nh, ne, Na, Nd, temp)
@@ -352,12 +419,9 @@ def uDCS_compensated(carrier, vals, nh, ne, Na, Nd, temp):
     if carrier == 'e':
         mob = -1
 
-    # if the holes are larger at any point, assume
-    # they are the majority carriers
-    if np.any(nh * mob > ne * mob):
-        mob = cal_min()
-    else:
-        mob = cal_maj()
+    # where the carrier is the minority carrier use the minority
+    # expression, else the majority one
+    mob = np.where(nh * mob > ne * mob, cal_min(), cal_maj())
 
     return mob
 
@@ -388,16 +452,17 @@ def Nsceff(carrier, vals, nh, ne, Na, Nd, temp):
     car_den = return_carrer(carrier, nh, ne, opposite=True)
 
     if carrier == 'e':
-        N_a = G(carrier, vals, nh, ne, Na, Nd, temp)
-        N_a *= return_dopant('h', Na, Nd) * Z('h', vals, Na, Nd)
+        N_a = G(carrier, vals, nh, ne, Na, Nd, temp) * \
+            return_dopant('h', Na, Nd) * Z('h', vals, Na, Nd)
         N_d = return_dopant('e', Na, Nd) * Z('e', vals, Na, Nd)
     elif carrier == 'h':
-        N_d = G(carrier, vals, nh, ne, Na, Nd, temp)
-        N_d *= return_dopant('e', Na, Nd) * Z('e', vals, Na, Nd)
+        N_d = G(carrier, vals, nh, ne, Na, Nd, temp) * \
+            return_dopant('e', Na, Nd) * Z('e', vals, Na, Nd)
         N_a = return_dopant('h', Na, Nd) * Z('h', vals, Na, Nd)
 
     else:
-        print('Something has gone wrong in the code')
+        raise ValueError(
+            'incorrect input for carrier input: {0}'.format(carrier))
 
     # plt.figure('test')
     # print ' starting:'
@@ -412,13 +477,13 @@ def Z(carrier, vals, Na, Nd):
     """
     accounts for high doping effects - clustering
     """
-    index = return_dopant(carrier, Na, Nd) == 0
+    dopant = return_dopant(carrier, Na, Nd)
+
+    with np.errstate(divide='ignore'):
+        z = 1. + 1. / (vals['c_' + carrier] +
+                       (vals['nref2_' + carrier] / dopant)**2.)
 
-    z = 1. + 1. / (vals['c_' + carrier] +
-                   (vals['nref2_' + carrier] / return_dopant(carrier, Na,
-                                                             Nd))**2.)
-    z[index] = 1
-    return z
+    return np.where(dopant == 0, 1., z)
 
 
 def G(carrier, vals, nh, ne, Na, Nd, temp):
@@ -498,8 +563,8 @@ def return_carrer(carrier, nh, ne, opposite=True):
 def return_dopant(carrier, Na, Nd):
 
     if carrier == 'h':
-        dopant = np.array([Na]).flatten()
+        dopant = np.atleast_1d(np.asarray(Na, dtype=float))
     elif carrier == 'e':
-        dopant = np.array([Nd]).flatten()
+        dopant = np.atleast_1d(np.asarray(Nd, dtype=float))
 
     return dopant
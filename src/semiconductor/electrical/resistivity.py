@@ -1,13 +1,22 @@
 
 import numpy as np
+import threading
+from collections import OrderedDict
 import scipy.constants as const
 import scipy.optimize as opt
 
-from semiconductor.general_functions.carrierfunctions import get_carriers
+from semiconductor.general_functions.carrierfunctions import get_carriers, get_ni
 from semiconductor.material.intrinsic_carrier_density import IntrinsicCarrierDensity as ni
 from semiconductor.electrical.mobility import Mobility as Mob
 from semiconductor.electrical.ionisation import Ionisation as Ion
-from semiconductor.helper.helper import BaseModelClass
+from semiconductor.helper.helper import BaseModelClass, _link_state
+
+
+# precomputed resistivity(doping) tables, shared by all instances. Only
+# the most recently used tables are kept.
+_doping_tables = OrderedDict()
+_max_doping_tables = 32
+_doping_tables_lock = threading.Lock()
 
 
 class Conductivity(BaseModelClass):
@@ -48,13 +57,16 @@ class Conductivity(BaseModelClass):
         'resistivity': 1.
     }
 
+    _link_keys = ('material', 'temp', 'mob_author', 'nieff_author',
+                  'ionis_author')
+
     def __init__(self, **kwargs):
         self.calculationdetails = kwargs
 
     def _update_links(self):
 
-        # setting downstream values, this should change from initalisation
-        # to just updating through the update function
+        # the downstream models are only rebuilt when one of
+        # the values in _link_keys changes
         self.Mob = Mob(material=self._cal_dts['material'],
                        author=self._cal_dts['mob_author'],
                        temp=self._cal_dts['temp'])
@@ -72,13 +84,18 @@ class Conductivity(BaseModelClass):
     def _conductivity(self, **kwargs):
 
         self.calculationdetails = kwargs
-        self._update_links()
+        self._refresh_links()
+
+        # the intrinsic carrier density is the same for both calls below
+        ni_value = get_ni(temp=self._cal_dts['temp'],
+                          material=self._cal_dts['material'],
+                          author=self._cal_dts['nieff_author'])
 
         Nid, Nia = get_carriers(nxc=0,
                                 Na=self._cal_dts['Na'],
                                 Nd=self._cal_dts['Nd'],
                                 temp=self._cal_dts['temp'],
-                                ni_author=self._cal_dts['nieff_author']
+                                ni=ni_value
                                 )
 
         if np.all(Nid > Nia):
@@ -97,16 +114,12 @@ class Conductivity(BaseModelClass):
             Nd=Nid,
             nxc=self._cal_dts['nxc'],
             temp=self._cal_dts['temp'],
-            ni_author=self._cal_dts['nieff_author']
+            ni=ni_value
         )
 
-        mob_e = self.Mob.electron_mobility(nxc=self._cal_dts['nxc'],
-                                           Na=self._cal_dts['Na'],
-                                           Nd=self._cal_dts['Nd']
-                                           )
-        mob_h = self.Mob.hole_mobility(nxc=self._cal_dts['nxc'],
-                                       Na=self._cal_dts['Na'],
-                                       Nd=self._cal_dts['Nd'])
+        mob_e, mob_h = self.Mob.carrier_mobilities(nxc=self._cal_dts['nxc'],
+                                                   Na=self._cal_dts['Na'],
+                                                   Nd=self._cal_dts['Nd'])
 
         return const.e * (mob_e * ne + mob_h * nh)
 
@@ -176,6 +189,10 @@ class DarkConductivity(BaseModelClass):
             The author of a model to be used for dopant ionisation
         6. dopant_type (str)
             The type of typnt n or p  
+        7. p_dopant (str)
+            The elemental name of the acceptor used for p type samples
+        8. n_dopant (str)
+            The elemental name of the donor used for n type samples
     '''
 
     _cal_dts = {
@@ -185,21 +202,53 @@ class DarkConductivity(BaseModelClass):
         'nieff_author': None,
         'ionis_author': None,
         'dopant_type': 'p',
+        'p_dopant': 'boron',
+        'n_dopant': 'phosphorous',
         'nxc': 1,
         'dark_resistivity': 1.
     }
 
+    _link_keys = ('material', 'temp', 'mob_author', 'nieff_author',
+                  'ionis_author', 'p_dopant', 'n_dopant')
+
+    # the range of doping, in log10(cm^-3), searched when inverting
+    _log_doping_range = (9., 21.5)
+
     def __init__(self, **kwargs):
         self.calculationdetails = kwargs
-        self._update_links()
+        self._refresh_links()
 
     def _update_links(self):
 
-        # setting downstream values, this should change from initalisation
-        # to just updating through the update function
+        # the downstream models are only rebuilt when one of
+        # the values in _link_keys changes
         self.Mob = Mob(material=self._cal_dts['material'],
                        author=self._cal_dts['mob_author'],
                        temp=self._cal_dts['temp'])
+        self.cond = Conductivity(**self._cal_dts)
+
+        # a conductivity per dopant type, so each has the right dopant
+        self._type_cond = {}
+        for dopant_type in ['p', 'n']:
+            self._type_cond[dopant_type] = Conductivity(**self._cal_dts)
+            self._type_cond[dopant_type].calculationdetails = {
+                'dopant': self._cal_dts[dopant_type + '_dopant']}
+
+    def _conductivity(self, dopant_type=None):
+        '''
+        returns the linked conductivity model, for a dopant type if
+        given, updated with the current values that do not cause a link,
+        e.g. nxc
+        '''
+        if dopant_type is None:
+            cond = self.cond
+        else:
+            cond = self._type_cond[dopant_type]
+
+        cond.calculationdetails = {
+            key: value for key, value in self._cal_dts.items()
+            if key not in self._link_keys}
+        return cond
 
     def query_used_authors(self):
         return self.Mob.model, self.ni.model, self.ion.model
@@ -230,7 +279,7 @@ class DarkConductivity(BaseModelClass):
 
         if bool(kwargs):
             self.calculationdetails = kwargs
-            self._update_links()
+            self._refresh_links()
 
         mob_e = self.Mob.electron_mobility(nxc=1,
                                            Na=0,
@@ -240,7 +289,7 @@ class DarkConductivity(BaseModelClass):
         # # get an inital guess
         Na = dark_conductivity / const.e / mob_e
 
-        cond = Conductivity(**self._cal_dts)
+        cond = self._conductivity()
 
         def cal_dop(N, dopant_type, dark_conductivity):
             if dopant_type == 'p':
@@ -258,3 +307,221 @@ class DarkConductivity(BaseModelClass):
                           args=(self._cal_dts['dopant_type'], dark_conductivity),))
 
         return dop
+
+    def _dark_conductivity(self, doping, dopant_type):
+        '''
+        returns the dark conductivity for doping densities of a single
+        dopant type
+        '''
+        if dopant_type == 'p':
+            Na, Nd = doping, 0
+        elif dopant_type == 'n':
+            Na, Nd = 0, doping
+        else:
+            raise ValueError(
+                'dopant_type must be n or p, not {0}'.format(dopant_type))
+
+        return self._conductivity(dopant_type).calculate(Na=Na, Nd=Nd)
+
+    def doping_table(self, dopant_type=None, points_per_decade=20):
+        '''
+        returns a precomputed table of doping and resistivity. The tables
+        are shared between all instances with the same calculation
+        details, e.g. material, temperature, authors, dopant and nxc.
+
+        inputs:
+            dopant_type: (str, optional)
+                n or p. If not provided the value in cal_dts is used
+            points_per_decade: (int)
+                the number of doping values per decade of doping
+
+        output:
+            log10 of the doping, and log10 of the resistivity. The doping
+            increases and the resistivity monotonically decreases.
+        '''
+        if dopant_type is None:
+            dopant_type = self._cal_dts['dopant_type']
+
+        # everything the conductivity is calculated with
+        key = tuple((k, _link_state(self._cal_dts[k]))
+                    for k in sorted(self._cal_dts)
+                    if k not in ('dopant_type', 'dark_resistivity'))
+        key += (dopant_type, points_per_decade)
+
+        with _doping_tables_lock:
+            if key in _doping_tables:
+                _doping_tables.move_to_end(key)
+                return _doping_tables[key]
+
+        lower, upper = self._log_doping_range
+        log_doping = np.linspace(
+            lower, upper, int((upper - lower) * points_per_decade) + 1)
+
+        log_res = -np.log10(
+            self._dark_conductivity(10**log_doping, dopant_type))
+        # force the table to be monotone, so the inversion is unique
+        log_res = np.minimum.accumulate(log_res)
+
+        with _doping_tables_lock:
+            _doping_tables[key] = (log_doping, log_res)
+            while len(_doping_tables) > _max_doping_tables:
+                _doping_tables.popitem(last=False)
+
+        return log_doping, log_res
+
+    def dark_resistivity2doping_map(self, dark_resistivity, **kwargs):
+        '''
+        cacluate the doping for an array of resistivities, e.g. a wafer
+        map. See dark_conductivity2doping_map for the inputs.
+        '''
+        return self.dark_conductivity2doping_map(
+            1. / np.asarray(dark_resistivity, dtype=float), **kwargs)
+
+    def dark_conductivity2doping_map(self, dark_conductivity,
+                                     dopant_type=None, tol=1e-6,
+                                     max_iter=50, use_table=False,
+                                     full_output=False, **kwargs):
+        '''
+        cacluate the doping for an array of dark conductivities at once.
+
+        All points are solved together with a safeguarded Newton method in
+        log(doping). A point that would step outside of its bracket is
+        bisected instead, and points drop out of the calculation once they
+        have converged.
+
+        Inputs:
+            dark_conductivity: (array like)
+                The conductivty of the sample in the dark
+            dopant_type: (str or array like of str, optional)
+                n or p, either for all points or for each point. If not
+                provided the value in cal_dts is used
+            tol: (float)
+                The relative tolerance on the conductivity
+            max_iter: (int)
+                The maximum number of Newton steps per point
+            use_table: (bool)
+                If True the starting values are taken from a precomputed
+                resistivity(doping) table. With max_iter=0 this returns the
+                interpolated table values, without evaluating the model,
+                and the residual is not known (NaN).
+            full_output: (bool)
+                If True a dictionary with the number of iterations, the
+                final relative residual and if each point converged is
+                also returned.
+            **kwargs: (optional)
+                Any of the values found in cal_dts
+
+        Ouput:
+            doping: (array)
+                The substitutional doping density.
+            info: (dict, only if full_output is True)
+        '''
+        if bool(kwargs):
+            self.calculationdetails = kwargs
+            self._refresh_links()
+
+        dark_conductivity = np.asarray(dark_conductivity, dtype=float)
+        shape = dark_conductivity.shape
+        target = np.log(dark_conductivity.ravel())
+
+        if dopant_type is None:
+            dopant_type = self._cal_dts['dopant_type']
+        dopant_type = np.broadcast_to(np.asarray(dopant_type), shape).ravel()
+
+        log_doping = np.empty(target.shape)
+        iterations = np.zeros(target.shape, dtype=int)
+        residual = np.full(target.shape, np.nan)
+
+        for dtype in np.unique(dopant_type):
+            index = np.flatnonzero(dopant_type == dtype)
+
+            log_doping[index], iterations[index], residual[index] = \
+                self._invert(target[index], str(dtype), tol, max_iter,
+                             use_table)
+
+        doping = (10**log_doping).reshape(shape)
+
+        if full_output:
+            info = {
+                'iterations': iterations.reshape(shape),
+                'residual': residual.reshape(shape),
+                'converged': (np.abs(residual) < tol).reshape(shape),
+            }
+            return doping, info
+
+        return doping
+
+    def _invert(self, target, dopant_type, tol, max_iter, use_table):
+        '''
+        solves log(conductivity(doping)) = target for log10(doping)
+        '''
+        # the step used for the numerical derivative in log10(doping)
+        step = 1e-4
+
+        lower = np.full(target.shape, self._log_doping_range[0])
+        upper = np.full(target.shape, self._log_doping_range[1])
+
+        if use_table:
+            table_doping, table_res = self.doping_table(dopant_type)
+            # the table is decreasing in resistivity, so flip it for interp
+            x = np.interp(-target / np.log(10),
+                          table_res[::-1], table_doping[::-1])
+        else:
+            # inital guess from the lowly doped majority carrier mobility
+            if dopant_type == 'p':
+                mob = self.Mob.hole_mobility(nxc=1, Na=0, Nd=0)
+            else:
+                mob = self.Mob.electron_mobility(nxc=1, Na=0, Nd=0)
+            x = np.log10(np.exp(target) / const.e / mob)
+
+        x = np.clip(x, lower, upper)
+
+        iterations = np.zeros(target.shape, dtype=int)
+        residual = np.full(target.shape, np.nan)
+        active = np.arange(target.shape[0])
+
+        for iteration in range(max_iter + 1):
+            xa = x[active]
+            n = xa.shape[0]
+
+            # the table values are returned as they are
+            if use_table and max_iter == 0:
+                break
+
+            # the last pass only evaluates the residual
+            if iteration == max_iter:
+                residual[active] = np.expm1(np.log(
+                    self._dark_conductivity(10**xa, dopant_type)) -
+                    target[active])
+                break
+
+            # evaluate the function and its derivative in one call
+            sigma = np.log(self._dark_conductivity(
+                10**np.concatenate((xa, xa + step)), dopant_type))
+            f = sigma[:n] - target[active]
+            df = (sigma[n:] - sigma[:n]) / step
+
+            residual[active] = np.expm1(f)
+
+            # drop the points that have converged
+            keep = np.abs(residual[active]) >= tol
+            active, xa, f, df = active[keep], xa[keep], f[keep], df[keep]
+            if not active.size:
+                break
+
+            # update the brackets
+            below = f < 0
+            lower[active[below]] = xa[below]
+            upper[active[~below]] = xa[~below]
+
+            # take a newton step, or bisect if it leaves the bracket
+            with np.errstate(divide='ignore', invalid='ignore'):
+                x_new = xa - f / df
+            outside = ~((x_new > lower[active]) & (x_new < upper[active]))
+            x_new[outside] = 0.5 * (lower[active[outside]] +
+                                    upper[active[outside]])
+
+            x[active] = x_new
+            iterations[active] += 1
+
+        return x, iterations, residual
@@ -2,12 +2,88 @@
 # UTF-8
 
 import numpy as np
+import threading
+from collections import OrderedDict
 from semiconductor.material.intrinsic_carrier_density import IntrinsicCarrierDensity as NI
 # from semiconductor.electrical.ionisation import Ionisation as ion
 # import fdint as fd
 import scipy.constants as const
 
 
+class IntrinsicCarrierDensityCache():
+    '''
+    A memoised provider of the intrinsic carrier density.
+
+    Values are stored against the material, author and temperature, with
+    the least recently used values discarded once maxsize values are
+    stored. The returned arrays are read only as they are shared between
+    callers.
+    '''
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(material, author, temp):
+        temp = np.asarray(temp, dtype=float)
+        return (material, author, temp.shape, temp.tobytes())
+
+    def get(self, temp=300, material='Si', author=None):
+        '''
+        returns the intrinsic carrier density
+
+        inputs:
+            temp: (float or array like)
+                the temperature in kelvin
+            material: (str)
+                The elemental name for the material
+            author: (str)
+                The author of the intrinsic carrier density model
+        output:
+            The intrinsic carrier density in |cm-3|.
+        '''
+        key = self._key(material, author, temp)
+
+        with self._lock:
+            if key in self._values:
+                self.hits += 1
+                self._values.move_to_end(key)
+                return self._values[key]
+            self.misses += 1
+
+        ni = np.array(NI(material=material).update(author=author, temp=temp),
+                      dtype=float)
+        ni.flags.writeable = False
+
+        with self._lock:
+            self._values[key] = ni
+            while len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+
+        return ni
+
+    def clear(self):
+        '''
+        removes all stored values
+        '''
+        with self._lock:
+            self._values.clear()
+
+
+ni_cache = IntrinsicCarrierDensityCache()
+
+
+def get_ni(temp=300, material='Si', author=None):
+    '''
+    returns the intrinsic carrier density from the shared cache
+    '''
+    return ni_cache.get(temp=temp, material=material, author=author)
+
+
 def get_carriers(Na, Nd, nxc,
                  temp=300, material='Si', ni_author=None, ni=None,
                  ionisation_author=None):
@@ -21,6 +97,10 @@ def get_carriers(Na, Nd, nxc,
     nxc = the excess carrier density. In this function assume
                   deltap = deltan
     temp = temperature
+
+    Na, Nd, nxc and temp can be arrays of any shape that broadcast
+    together, e.g. Nd[:, None, None], nxc[None, :, None] and
+    temp[None, None, :] return a full 3D grid.
     ni: (optional)
         provide  a values so this function doesn't calculate ni
 
@@ -29,16 +109,23 @@ def get_carriers(Na, Nd, nxc,
     '''
 
     # check types
-    if not isinstance(Na, np.ndarray):
-        Na = np.asarray([Na])
-    if not isinstance(Nd, np.ndarray):
-        Nd = np.asarray([Nd])
-    if not isinstance(nxc, np.ndarray):
-        nxc = np.array([nxc])
+    Na = np.atleast_1d(np.asarray(Na, dtype=float))
+    Nd = np.atleast_1d(np.asarray(Nd, dtype=float))
+    nxc = np.atleast_1d(np.asarray(nxc, dtype=float))
 
     # if ni not provided obtain
     if ni is None:
-        ni = NI(material=material).update(author=ni_author, temp=temp)
+        ni = get_ni(temp=temp, material=material, author=ni_author)
+    ni = np.asarray(ni, dtype=float)
+
+    # all the inputs follow numpy's broadcasting rules
+    try:
+        np.broadcast(Na, Nd, nxc, ni)
+    except ValueError:
+        raise ValueError(
+            'Na {0}, Nd {1}, nxc {2} and ni (from temp) {3} can not be '
+            'broadcast together'.format(
+                Na.shape, Nd.shape, nxc.shape, ni.shape))
 
     # Calculated on the assumption that at thermal equilibrium in the
     # dark n0p0 = ni**2, and that charge neutrality holds. Usually
@@ -51,42 +138,16 @@ def get_carriers(Na, Nd, nxc,
                           np.sqrt((Nd - Na)**2 + 4 * ni**2)))
     min_car_den = ni**2 / maj_car_den
 
-    # assign the dark minority carriers
-    ne0 = np.copy(min_car_den)
-    nh0 = np.copy(min_car_den)
-
     # check the doping and assign
     # if the number of donars are larger
     index = Na < Nd
 
-    nh0[~index] = maj_car_den[~index]
-    ne0[index] = maj_car_den[index]
-
-    # add the number of excess carriers
-    assert ne0.shape == nh0.shape
-    # make the excess carrier the right shape to add
-    if nxc.shape[0] == 1 or nh0.shape[0] == 1 or nxc.shape[0] == nh0.shape[0]:
-
-        # add them to the dark carriers
-        ne = ne0 + nxc
-        nh = nh0 + nxc
-
-    else:
-        print("I can't work with these dimensions")
-        print("nxc: {0} \n nh0: {1} \n nE0: {2}".format(
-            nxc.shape, nh0.shape, ne0.shape))
-        raise ValueError
-
-    # To make sure an array the same shape as the input array is returned
-    # Note this function does not play well if  both an array of dopants
-    # and excess carrerier densities are passed
+    ne0 = np.where(index, maj_car_den, min_car_den)
+    nh0 = np.where(index, min_car_den, maj_car_den)
 
-    # if ne0.shape[0] == 1:
-    #     ne = ne[0]
-    #     nh = nh[0]
-    # else:
-    #     ne = ne.flatten()
-    #     nh = nh.flatten()
+    # add the number of excess carriers to the dark carriers
+    ne = ne0 + nxc
+    nh = nh0 + nxc
 
     return ne, nh
 
@@ -141,7 +202,6 @@ def fermi2carrier_boltz(Ef, ni_author=None, eg_author=None, temp=300,
 
     # this may have to be the effective ni, i'm not sure
     ni = 2.831801e10
-    print(ni)
     Nc = 2.857082e19
     Nv = 2.513669e19
     Eg = -np.log(ni**2 / Nc / Nv) * const.k * temp / const.e
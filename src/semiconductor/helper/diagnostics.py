@@ -0,0 +1,71 @@
+'''
+Diagnostics for the calculators.
+
+Messages go to the 'semiconductor' logger, which only has a NullHandler,
+so nothing is written to the console unless the application asks for it,
+e.g. with logging.basicConfig(level=logging.INFO). Warnings are rate
+limited, so a warning raised inside a loop or a worker is only emitted
+once per interval, with a count of the ones that were dropped.
+'''
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger('semiconductor')
+logger.addHandler(logging.NullHandler())
+
+# the default minimum time between two warnings with the same key, in s
+interval = 60.
+
+_warned = {}
+_lock = threading.Lock()
+
+
+def warn(message, *args, **kwargs):
+    '''
+    Logs a warning, at most once per interval for each key.
+
+    inputs:
+        message: (str)
+            the message, formatted with args by logging
+        key: (optional)
+            what identifies repeats of the warning, the message by default
+        interval: (float, optional)
+            the minimum time between two warnings with the same key
+    '''
+    key = kwargs.get('key', message)
+    wait = kwargs.get('interval', interval)
+
+    if not logger.isEnabledFor(logging.WARNING):
+        return
+
+    now = time.monotonic()
+    with _lock:
+        last, dropped = _warned.get(key, (None, 0))
+        if last is not None and now - last < wait:
+            _warned[key] = (last, dropped + 1)
+            return
+        _warned[key] = (now, 0)
+
+    if dropped:
+        message += ' ({0} similar warnings suppressed)'.format(dropped)
+
+    logger.warning(message, *args)
+
+
+def debug(message, *args):
+    '''
+    Logs a debug message. This is cheap when debugging is off, as the
+    message is only formatted if it is emitted.
+    '''
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(message, *args)
+
+
+def reset():
+    '''
+    Forgets which warnings have been emitted.
+    '''
+    with _lock:
+        _warned.clear()
@@ -1,17 +1,30 @@
 #!/usr/local/bin/python
 # UTF-8
 
-import matplotlib.pylab as plt
 import numpy as np
+import configparser
+import copy
 import json
 import inspect
 import numbers
-# try:
-#     import ConfigParser as configparser
-# except:
-#     import configparser
+import os
+import threading
+import types
 import ruamel.yaml as yaml
 
+from semiconductor.helper import diagnostics
+
+
+def get_pyplot():
+    '''
+    Returns matplotlib's pyplot.
+
+    It is only imported the first time something is plotted, so that
+    importing the calculators does not load matplotlib or a GUI backend.
+    '''
+    import matplotlib.pyplot as plt
+    return plt
+
 
 def change_model(Models, author=None):
     '''
@@ -36,8 +49,8 @@ def class_or_value(value, clas, value_updater, **kwargs):
             ret = getattr(c, value_updater)(author=value)
             value = c.calculationdetails['author']
         else:
-            print('value', value, c.available_models())
-            raise
+            raise ValueError('{0} is not an available model, try one of '
+                             '{1}'.format(value, c.available_models()))
     elif isinstance(value, numbers.Number):
         ret = value
 
@@ -47,16 +60,179 @@ def class_or_value(value, clas, value_updater, **kwargs):
     return ret, value
 
 
+def _freeze(value):
+    '''
+    returns a read only version of parsed model data
+    '''
+    if isinstance(value, dict):
+        return types.MappingProxyType(
+            {key: _freeze(val) for key, val in value.items()})
+    elif isinstance(value, list):
+        return tuple(_freeze(val) for val in value)
+    return value
+
+
+def _read_const(f):
+    '''
+    reads the models in an ini style .const file, with the values that are
+    numbers converted to floats
+    '''
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.read_file(f)
+
+    Models = {}
+    for section in parser.sections():
+        Models[section] = {}
+        for key, value in parser.items(section):
+            try:
+                value = float(value)
+            except ValueError:
+                pass
+            Models[section][key] = value
+
+    return Models
+
+
+class ModelRegistry():
+    '''
+    A process wide cache of the parsed model files.
+
+    Each file is parsed once and stored against its path and modification
+    time. The models are handed out as read only mappings, so they can be
+    shared between all instances (and threads) without being copied.
+    '''
+
+    def __init__(self):
+        self._models = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, fname):
+        '''
+        returns the read only models found in fname
+
+        inputs:
+            fname: (str)
+                the path to the yaml, or ini style .const, file containing
+            the models
+        output:
+            a read only mapping of author to model values
+        '''
+        fname = os.path.realpath(fname)
+        mtime = os.stat(fname).st_mtime_ns
+
+        with self._lock:
+            cached = self._models.get(fname)
+            if cached is not None and cached[0] == mtime:
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+
+        Models = {}
+        with open(fname, 'r') as f:
+            if fname.endswith('.const'):
+                Models.update(_read_const(f))
+            else:
+                for i in yaml.safe_load_all(f):
+                    Models.update(i)
+        Models = _freeze(Models)
+
+        with self._lock:
+            self._models[fname] = (mtime, Models)
+
+        return Models
+
+    def invalidate(self, fname=None):
+        '''
+        removes a file from the cache, or all files if none is provided
+        '''
+        with self._lock:
+            if fname is None:
+                self._models.clear()
+            else:
+                self._models.pop(os.path.realpath(fname), None)
+
+    def stats(self):
+        '''
+        returns the number of cache hits, misses and cached files
+        '''
+        with self._lock:
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'files': len(self._models)}
+
+
+model_registry = ModelRegistry()
+
+
+def _link_state(value):
+    '''
+    returns a comparable version of a calculation detail
+    '''
+    if isinstance(value, np.ndarray):
+        return (value.shape, value.dtype.str, value.tobytes())
+    elif isinstance(value, (list, tuple)):
+        return tuple(_link_state(val) for val in value)
+    return value
+
+
 class BaseModelClass():
+    '''
+    The base class for all the calculators.
+
+    The class level _cal_dts only provides the default values. Each
+    instance receives its own copy when it is created, and the model
+    values are shared read only through the model registry. Calculators
+    can therefore be used concurrently from a
+    concurrent.futures.ThreadPoolExecutor, provided each thread works with
+    its own instance. A single instance should not be shared between
+    threads, as calling it updates its calculation details.
+    '''
 
     _cal_dts = {
         'material': 'Si',
         'temp': 300,
     }
 
+    def __new__(cls, *args, **kwargs):
+        self = super(BaseModelClass, cls).__new__(cls)
+        # each instance owns its calculation details
+        self._cal_dts = copy.deepcopy(cls._cal_dts)
+        return self
+
+    # the calculation details the linked models are built from
+    _link_keys = ()
+
     def __init__(self):
         pass
 
+    def _update_links(self):
+        pass
+
+    def _link_values(self):
+        '''
+        returns the current state of the values the links depend on
+        '''
+        return tuple(_link_state(self._cal_dts.get(key))
+                     for key in self._link_keys)
+
+    def _refresh_links(self):
+        '''
+        rebuilds the linked models only if a calculation detail they
+        depend on has changed since they were last built.
+
+        output:
+            True if the links were rebuilt
+        '''
+        if getattr(self, '_links_built_from', None) == self._link_values():
+            return False
+
+        self._update_links()
+        # taken after building, as building can resolve default authors
+        self._links_built_from = self._link_values()
+        return True
+
     @property
     def calculationdetails(self):
         return self._cal_dts
@@ -74,11 +250,7 @@ class BaseModelClass():
                 self._cal_dts[item] = kwargs[item]
 
     def _int_model(self, fname):
-        self.Models = {}
-
-        with open(fname, 'r') as f:
-            for i in yaml.safe_load_all(f):
-                self.Models.update(i)
+        self.Models = model_registry.load(fname)
 
     def change_model(self, author, Models=None):
 
@@ -87,6 +259,85 @@ class BaseModelClass():
         self.vals, self.model, self._cal_dts['author'] = change_model(
             Models, author)
 
+    def _clone(self):
+        '''
+        Returns a copy of the calculator that can change model and
+        calculation details without changing this one. Linked calculators
+        are cloned as well, while the read only model data is shared.
+        '''
+        clone = copy.copy(self)
+        clone._cal_dts = copy.deepcopy(self._cal_dts)
+
+        for name, value in vars(self).items():
+            if isinstance(value, BaseModelClass):
+                setattr(clone, name, value._clone())
+            elif isinstance(value, dict) and any(
+                    isinstance(v, BaseModelClass) for v in value.values()):
+                setattr(clone, name, {
+                    k: v._clone() if isinstance(v, BaseModelClass) else v
+                    for k, v in value.items()})
+
+        return clone
+
+    def evaluate_all_models(self, update_function, authors=None,
+                            max_workers=None, **inputs):
+        '''
+        Evaluates update_function for every author and stacks the results.
+
+        inputs:
+            update_function: str
+                the name of the specific function used to update the author
+                i.e 'update'
+            authors: (list, optional)
+                the authors to evaluate, all the available models if None
+            max_workers: (int, optional)
+                if given the authors are evaluated on a thread pool of this
+                size, each on its own clone of the calculator
+            **inputs:
+                variables to be passed to the update function.
+
+        output:
+            values: (array)
+                of shape (n_authors, ...), the results of the different
+                authors broadcast to a common shape
+            authors: (list)
+                the author of each row of values
+        '''
+        if authors is None:
+            authors = self.available_models()
+        authors = list(authors)
+
+        # ni is shared by all the authors, so make sure it is only
+        # calculated once and then read from the cache
+        if 'ni_author' in self._cal_dts:
+            from semiconductor.general_functions.carrierfunctions import \
+                get_ni
+            get_ni(temp=inputs.get('temp', self._cal_dts.get('temp', 300.)),
+                   material=inputs.get('material',
+                                       self._cal_dts.get('material', 'Si')),
+                   author=inputs.get('ni_author',
+                                     self._cal_dts['ni_author']))
+
+        def evaluate(calculator, author):
+            calculator.change_model(author)
+            return np.asarray(
+                getattr(calculator, update_function)(**inputs), dtype=float)
+
+        if max_workers is None:
+            current = self._cal_dts['author']
+            results = [evaluate(self, author) for author in authors]
+            self.change_model(current)
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(
+                    evaluate, [self._clone() for author in authors],
+                    authors))
+
+        values = np.stack(np.broadcast_arrays(*results))
+
+        return values, authors
+
     def plot_all_models(self, update_function, xvalues=None, **kwargs):
         '''
         cycles through all the models and plots the result
@@ -97,11 +348,11 @@ class BaseModelClass():
             **kwargs:
                 variables to be passed to the update function.
         '''
-        fig, ax = plt.subplots(1)
-        for model in self.available_models():
+        plt = get_pyplot()
+        values, authors = self.evaluate_all_models(update_function, **kwargs)
 
-            self.change_model(model)
-            result = getattr(self, update_function)(**kwargs)
+        fig, ax = plt.subplots(1)
+        for model, result in zip(authors, values):
             if xvalues is None:
                 ax.plot(result, label=model)
             else:
@@ -114,6 +365,7 @@ class BaseModelClass():
         Lets you get a unique range of colours,
         and have repeats of colours
         '''
+        plt = get_pyplot()
 
         colours = []
 
@@ -161,13 +413,14 @@ class BaseModelClass():
 
         # does the filtering
         if Filter is not None:
-            for c, author in enumerate(author_list):
-                if self.Models[author][Filter] not in Filter_value:
-                    author_list.remove(author)
+            author_list = [
+                author for author in author_list
+                if Filter in self.Models[author] and
+                self.Models[author][Filter] in Filter_value]
 
-        # prints no models available
+        # warns no models available
         if not author_list:
-            print('No authors for this models available')
+            diagnostics.warn('No authors for this models available')
 
         return author_list
 
@@ -193,6 +446,95 @@ class BaseModelClass():
                 print('No notes')
 
 
+def check_thread_safety(repeats=20, max_workers=8):
+    '''
+    A stress test of the concurrent use of calculators.
+
+    Several different configurations are evaluated serially, and then
+    repeatedly from a thread pool with each task building its own
+    instances. An AssertionError is raised if any of the threaded results
+    differ from the serial ones.
+    '''
+    from concurrent.futures import ThreadPoolExecutor
+    from semiconductor.electrical.mobility import Mobility
+    from semiconductor.material.bandgap_narrowing import BandGapNarrowing
+    from semiconductor.recombination.intrinsic import Intrinsic
+    from semiconductor.recombination.extrinsic import SRH
+
+    nxc = np.logspace(12, 17, 20)
+    doping = np.logspace(14, 19, 20)
+
+    def mobility(author, temp):
+        return Mobility(author=author, temp=temp).electron_mobility(
+            Na=0, Nd=doping, nxc=1e10)
+
+    def bgn(author, temp):
+        return BandGapNarrowing(author=author, temp=temp).update(
+            Na=doping, Nd=0, nxc=1e10)
+
+    def intrinsic(author, temp):
+        return Intrinsic(aug_author=author, temp=temp).tau(nxc)
+
+    def srh(defect, temp):
+        return SRH(defect=defect, temp=temp).tau(nxc=nxc)
+
+    tasks = [(mobility, 'Klaassen_1992', 300.),
+             (mobility, 'Klaassen_1992', 350.),
+             (mobility, 'Schindler_2014', 300.),
+             (bgn, 'Schenk_1988fer', 300.),
+             (bgn, 'Schenk_1988fer', 250.),
+             (intrinsic, 'Richter2012', 300.),
+             (intrinsic, 'Kerr2002_simple', 300.),
+             (srh, 'Fei_d', 300.),
+             (srh, 'FeB_a', 320.),
+             ]
+
+    reference = [func(*args) for func, *args in tasks]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [(i, executor.submit(func, *args))
+                   for repeat in range(repeats)
+                   for i, (func, *args) in enumerate(tasks)]
+
+        for i, future in futures:
+            assert np.allclose(future.result(), reference[i],
+                               rtol=1e-12, equal_nan=True), (
+                'threaded result differs for {0}{1}'.format(
+                    tasks[i][0].__name__, tasks[i][1:]))
+
+    return True
+
+
+def check_import_time(module='semiconductor.electrical', max_time=None):
+    '''
+    Imports a module in a fresh interpreter and returns the time it
+    took in seconds.
+
+    An AssertionError is raised if the import loaded matplotlib, or if
+    max_time is given and the import took longer than it.
+    '''
+    import subprocess
+    import sys
+
+    code = ('import sys, time\n'
+            't = time.perf_counter()\n'
+            'import {0}\n'
+            'print(time.perf_counter() - t)\n'
+            'print("matplotlib" in sys.modules)\n').format(module)
+
+    output = subprocess.check_output(
+        [sys.executable, '-c', code], universal_newlines=True).split()
+    import_time, loaded = float(output[-2]), output[-1] == 'True'
+
+    assert not loaded, 'importing {0} loaded matplotlib'.format(module)
+
+    if max_time is not None:
+        assert import_time < max_time, (
+            'importing {0} took {1:.2f} s'.format(module, import_time))
+
+    return import_time
+
+
 class Webplotdig_JSONreader:
     '''
     A class to handel the JSON output from
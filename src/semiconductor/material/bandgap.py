@@ -1,8 +1,6 @@
 #!/usr/local/bin/python
 # UTF-8
 
-import sys
-
 from semiconductor.material.bandgap_intrinsic import IntrinsicBandGap
 from semiconductor.material.bandgap_narrowing import BandGapNarrowing
 from semiconductor.helper.helper import BaseModelClass
@@ -45,13 +43,16 @@ class BandGap(BaseModelClass):
         'Nd': 0,
     }
 
+    # the authors and temperature are passed on each update
+    _link_keys = ('material',)
+
     def __init__(self, **kwargs):
         # update any values in cal_dts
         # that are passed
         self.calculationdetails = kwargs
 
         # pass values to models
-        self._update_links()
+        self._refresh_links()
 
     def _update_links(self):
 
@@ -75,6 +76,7 @@ class BandGap(BaseModelClass):
         Calculates the band gap for the given models
         '''
         self.calculationdetails = kwargs
+        self._refresh_links()
 
         # just prints a warning if the model is for the incorrect
         # dopants
@@ -83,7 +85,7 @@ class BandGap(BaseModelClass):
 
         # check dopant and model line up
         if self._cal_dts['BGN_author'] not in dopant_model_list:
-            sys.exit(
+            raise ValueError(
                 '''\nThe BGN author you have selected was not for your'''
                 ''' selected dopant.\n'''
                 '''Please try selecting one of the following authors:\n\t''' +
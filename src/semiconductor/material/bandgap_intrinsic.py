@@ -1,9 +1,8 @@
 
-import matplotlib.pylab as plt
 import os
 import numpy as np
 from semiconductor.material import bandgap_intrinsic_models as iBg
-from semiconductor.helper.helper import BaseModelClass
+from semiconductor.helper.helper import BaseModelClass, get_pyplot
 
 
 class IntrinsicBandGap(BaseModelClass):
@@ -80,6 +79,7 @@ class IntrinsicBandGap(BaseModelClass):
         Displays a plot of the models against that taken from a
         respected website (https://www.pvlighthouse.com.au/)
         '''
+        plt = get_pyplot()
         plt.figure('Intrinsic bandgap')
         t = np.linspace(1, 500)
 
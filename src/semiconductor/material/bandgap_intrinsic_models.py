@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import numpy as np
+from semiconductor.helper import diagnostics
 
 
 def Passler(vals, temp):
@@ -89,9 +90,8 @@ def Cubic_partial(vals, temp):
         returns the band gap in eV
     '''
 
-    # this line is to make sure the number is a numpy 1D array
-    # really this should be somewhere else, as a general function and not here
-    temp = np.asarray([temp * 1.]).flatten()
+    # make sure temp is an array, keeping its shape so it broadcasts
+    temp = np.atleast_1d(np.asarray(temp, dtype=float))
 
     Eg = np.copy(temp)
 
@@ -104,8 +104,8 @@ def Cubic_partial(vals, temp):
             vals['C' + str(i)] * temp[index]**2.
 
     if np.any(temp > vals['T2']):
-        print('\nWarning:'
-              '\n\tIntrinsic bandgap does not cover this temperature range\n')
+        diagnostics.warn(
+            'Intrinsic bandgap does not cover this temperature range')
         index = temp > vals['T2']
         Eg[index] = vals['A2'] + \
             vals['B2'] * temp[index] + \
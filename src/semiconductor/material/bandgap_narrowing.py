@@ -2,12 +2,11 @@
 # UTF-8
 
 import numpy as np
-import matplotlib.pylab as plt
 import os
 import configparser
 import scipy.constants as C
 
-from semiconductor.helper.helper import BaseModelClass
+from semiconductor.helper.helper import BaseModelClass, get_pyplot
 from semiconductor.material import bandgap_narrowing_models as Bgn
 from semiconductor.general_functions import carrierfunctions as GF
 
@@ -89,7 +88,8 @@ class BandGapNarrowing(BaseModelClass):
         ne, nh = GF.get_carriers(Na=self._cal_dts['Na'],
                                  Nd=self._cal_dts['Nd'],
                                  nxc=self._cal_dts['nxc'],
-                                 temp=self._cal_dts['temp'])
+                                 temp=self._cal_dts['temp'],
+                                 material=self._cal_dts['material'])
 
         doping = np.array(np.abs(self._cal_dts['Na'] - self._cal_dts['Nd']))
 
@@ -106,16 +106,10 @@ class BandGapNarrowing(BaseModelClass):
         '''
         returns the effective intrinsic carrier densitiy
         '''
-        if not isinstance(ni, np.ndarray):
-            ni = np.asarray([ni])
-
-        mult = self.ni_multiplier(**kwargs)
-
-        if not isinstance(mult, np.ndarray):
-            mult = np.asarray([mult])
-
-        assert ni.shape == mult.shape or ni.shape[0] == 1
+        ni = np.atleast_1d(np.asarray(ni, dtype=float))
+        mult = np.atleast_1d(self.ni_multiplier(**kwargs))
 
+        # ni and the multiplier follow numpy's broadcasting rules
         return ni * mult
 
     def ni_multiplier(self, **kwargs):
@@ -130,6 +124,7 @@ class BandGapNarrowing(BaseModelClass):
         return np.exp(BGN / vt / 2.)
 
     def check_models(self):
+        plt = get_pyplot()
         plt.figure('Bandgap narrowing')
         Nd = 0.
         dn = 1e14
@@ -205,6 +200,7 @@ def check_Schenk(fig, ax):
 
 if __name__ == '__main__':
 
+    plt = get_pyplot()
     bgn = BandGapNarrowing()
     bgn.check_models()
     plt.show()
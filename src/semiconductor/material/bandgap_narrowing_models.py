@@ -30,12 +30,12 @@ def apparent_BGN(vals, doping, **kargs):
 
     BGN = np.zeros(np.array(doping).shape)
 
-    index = doping > vals['n_onset']
+    index = doping > vals['N_onset']
 
     # making sure there are values to assign
     if np.sum(index) > 0:
         BGN[index] = (
-            vals['de_slope'] * np.log(doping[index] / vals['n_onset']))
+            vals['de_slope'] * np.log(doping[index] / vals['N_onset']))
 
     return BGN
 
@@ -92,21 +92,22 @@ def Schenk(vals, Nd, Na, ne, nh, temp, **args):
     n_p = vals['alphae'] * ne + vals['alphah'] * nh
 
     # cacualtes curly T, to give linear dependence with temp
-    vals['t'] = Const.k * temp / vals['ryex'] / Const.e
+    t = Const.k * temp / vals['ryex'] / Const.e
 
-    delta_Ec = ridged_shift(vals, n_sum, n_p, ne, 'e')\
-        + ionic_shift(vals, n_sum, n_p, n_ionic, 'e')
-    delta_EV = ridged_shift(vals, n_sum, n_p, nh, 'h')\
-        + ionic_shift(vals, n_sum, n_p, n_ionic, 'h')
+    delta_Ec = ridged_shift(vals, n_sum, n_p, ne, 'e', t)\
+        + ionic_shift(vals, n_sum, n_p, n_ionic, 'e', t)
+    delta_EV = ridged_shift(vals, n_sum, n_p, nh, 'h', t)\
+        + ionic_shift(vals, n_sum, n_p, n_ionic, 'h', t)
 
     # print(delta_Ec, delta_EV)
     return delta_Ec + delta_EV
 
 
-def ridged_shift(vals, n_sum, n_p, num_carrier, carrier):
+def ridged_shift(vals, n_sum, n_p, num_carrier, carrier, t):
     '''
     The rigid quasi-particle shift for a band
     the subscript a represents a carrier value (electron or hole)
+    t is the unitless temperature
     '''
 
     delta = -(
@@ -116,25 +117,26 @@ def ridged_shift(vals, n_sum, n_p, num_carrier, carrier):
             + vals['c' + carrier] * np.log(1. + vals['d' + carrier] *
                                            n_p**vals['p' + carrier]))
         + (8. * Const.pi * vals['alpha' + carrier] / vals['g' + carrier])
-        * num_carrier * vals['t']**2.
-        + np.sqrt(8. * Const.pi * n_sum) * vals['t']**(5. / 2.)
+        * num_carrier * t**2.
+        + np.sqrt(8. * Const.pi * n_sum) * t**(5. / 2.)
     ) / (
-        (4. * Const.pi)**3. * n_sum**2. + vals['t']**3. + vals['b' + carrier] *
-        np.sqrt(n_sum) * vals['t']**2. + 40. * n_sum**1.5 * vals['t'])
+        (4. * Const.pi)**3. * n_sum**2. + t**3. + vals['b' + carrier] *
+        np.sqrt(n_sum) * t**2. + 40. * n_sum**1.5 * t)
     return -vals['ryex'] * delta
 
 
-def ionic_shift(vals, n_sum, n_p, n_ionic, carrier):
+def ionic_shift(vals, n_sum, n_p, n_ionic, carrier, t):
     '''
     The ionic quasi-particle shift for a band
+    t is the unitless temperature
     '''
 
-    U = n_sum**2. / vals['t']**3.
+    U = n_sum**2. / t**3.
 
     delta = -n_ionic * (1. + U) / (
-        np.sqrt(vals['t'] * n_sum / 2. / Const.pi) *
+        np.sqrt(t * n_sum / 2. / Const.pi) *
         (
-            1. + vals['h' + carrier] * np.log(1. + np.sqrt(n_sum) / vals['t'])
+            1. + vals['h' + carrier] * np.log(1. + np.sqrt(n_sum) / t)
         )
         + vals['j' + carrier] * U * n_p**.75 *
         (1. + vals['k' + carrier] * n_p**vals['q' + carrier])
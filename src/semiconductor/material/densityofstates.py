@@ -2,11 +2,10 @@
 # UTF-8
 
 import numpy as np
-import matplotlib.pylab as plt
 import sys
 import os
 
-from semiconductor.helper.helper import BaseModelClass
+from semiconductor.helper.helper import BaseModelClass, get_pyplot
 from semiconductor.material import densityofstates_models as dos_models
 from semiconductor.material.bandgap_intrinsic import IntrinsicBandGap as Egi
 
@@ -105,6 +104,7 @@ class DOS(BaseModelClass):
         return self.Nc, self.Nv
 
     def check_models(self):
+        plt = get_pyplot()
         temp = np.logspace(0, np.log10(600))
         num = len(self.available_models())
 
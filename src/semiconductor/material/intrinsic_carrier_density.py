@@ -2,11 +2,10 @@
 # UTF-8
 
 import numpy as np
-from pylab import *
 import os
 import scipy.constants as Const
 from semiconductor.material.bandgap_intrinsic import IntrinsicBandGap
-from semiconductor.helper.helper import BaseModelClass
+from semiconductor.helper.helper import BaseModelClass, get_pyplot
 from semiconductor.material import ni_models
 
 
@@ -99,6 +98,7 @@ class IntrinsicCarrierDensity(BaseModelClass):
         '''
         Displays a plot of all the models against experimental data
         '''
+        plt = get_pyplot()
         # fig = plt.figure('Intrinsic carriers')
         fig, ax = plt.subplots(1)
         fig.suptitle('Intrinsic carrier concentration')
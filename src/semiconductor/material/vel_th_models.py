@@ -31,8 +31,8 @@ def Green_1990(vals, temp, Egratio, **kargs):
 
     vel_th_c = np.sqrt(8 * const.k * temp / np.pi / mth_c)
     # valance band effective mass, its a 7 order poynomial fit
-    mth_v = np.sum(
-        [vals['meth_v' + str(i)] * temp**i for i in range(8)]) * const.m_e
+    mth_v = sum(
+        vals['meth_v' + str(i)] * temp**i for i in range(8)) * const.m_e
 
     vel_th_v = np.sqrt(8 * const.k * temp / np.pi / mth_v)
 
@@ -1,10 +1,11 @@
 import numpy as np
-import matplotlib.pylab as plt
 import sys
 import os
+import time
+import tracemalloc
 import scipy.constants as Const
 import semiconductor.optical.opticalproperties as opticalproperties
-from semiconductor.helper.helper import BaseModelClass
+from semiconductor.helper.helper import BaseModelClass, get_pyplot
 
 
 class EscapeProbability(BaseModelClass):
@@ -22,6 +23,8 @@ class EscapeProbability(BaseModelClass):
         ref_rear=0.1,
         optics_k_author=None,
         optics_n_author=None,
+        dtype='float64',
+        max_memory=2**24,
         )
 
     def __init__(self,
@@ -47,6 +50,60 @@ class EscapeProbability(BaseModelClass):
 
         self._cal_dts['width'] = self.x[-1]
 
+    def _prepare(self, kwargs):
+        '''
+        updates the calculation details and makes sure there are optics
+        '''
+        if kwargs:
+            self.calculationdetails = kwargs
+            self._update_links()
+        elif not hasattr(self, '_optics'):
+            self._update_links()
+
+        self.width_from_xlegnth()
+
+    def _exponentials(self, terms):
+        '''
+        Returns the sum of exponentials of shape (x, wavelength)
+
+            sum coef * exp(-rate * alpha * (offset + sign * x))
+
+        Built a chunk of x at a time, with the exponentials taken in place,
+        so that no more than max_memory bytes of temporary values are used
+        on top of the result, which has the dtype in calculationdetails.
+
+        inputs:
+            terms: (list)
+                of (coef, rate, offset, sign), where coef can be an array
+                along wavelength
+        '''
+        dtype = np.dtype(self._cal_dts['dtype'])
+        alpha = np.asarray(self._optics.abs_cof_bb, dtype=dtype)
+        x = np.asarray(self.x, dtype=dtype)
+
+        terms = [(np.asarray(coef, dtype=dtype), -dtype.type(rate) * alpha,
+                  dtype.type(offset), dtype.type(sign))
+                 for coef, rate, offset, sign in terms]
+
+        escape = np.zeros((x.shape[0], alpha.shape[0]), dtype=dtype)
+        rows = max(1, int(self._cal_dts['max_memory']) //
+                   (dtype.itemsize * max(alpha.shape[0], 1)))
+        buffer = np.empty((min(rows, x.shape[0]), alpha.shape[0]),
+                          dtype=dtype)
+
+        for start in range(0, x.shape[0], rows):
+            stop = min(start + rows, x.shape[0])
+            chunk = buffer[:stop - start]
+
+            for coef, rate, offset, sign in terms:
+                np.multiply.outer(offset + sign * x[start:stop], rate,
+                                  out=chunk)
+                np.exp(chunk, out=chunk)
+                chunk *= coef
+                escape[start:stop] += chunk
+
+        return escape
+
     def double_side_lambertian(self, ax=None, **kwargs):
         """
         This is Rudigers model (2007), though its taken from Schinkes
@@ -58,89 +115,56 @@ class EscapeProbability(BaseModelClass):
         Width, refractive index. That seems to be it.
         There is no input for surface reflections
         """
-        if kwargs:
-            self.calculationdetails = kwargs
-            self._update_links()
-
-        self.width_from_xlegnth()
-
-        # self.theta = 60.
-        # self.theta_rad = self.theta / 180. * Const.pi
-        # self.theta = 0
+        self._prepare(kwargs)
+        width = self._cal_dts['width']
 
         # This line is as it is requried in the equation used below
-        a = 1. / self._optics.n**2
+        a = 1. / self._optics.ref_ind**2
         b = 1. / \
             (1. - (1 - a)**2 *
-             np.exp(-4 * self._optics.abs_cof_bb * self._cal_dts['width']))
-        c = (1. - a) * np.exp(-4 * self._cal_dts['width'] *
-                              self._optics.abs_cof_bb)
-
-        # Now cac both ways
-        xd_W = 2 * self._optics.abs_cof_bb * \
-            ((np.ones([self.x.shape[0], self._optics.abs_cof_bb.shape[0]]).T) *
-             (self._cal_dts['width'] - self.x)).T
-
-        xd = 2 * self._optics.abs_cof_bb * \
-            (np.ones([self.x.shape[0], self._optics.abs_cof_bb.shape[0]]).T *
-             self.x).T
-
-        # Calc both methods
-        self.escape_front = a * b * (
-            np.exp(-xd) + c * np.exp(xd)
-        )
+             np.exp(-4 * self._optics.abs_cof_bb * width))
 
-        # print np.exp(-xd_W).shape, (c * np.exp(xd_W)).shape
+        # the light that escapes directly, and after a reflection from the
+        # other surface, exp(-2 alpha x) and (1 - a) exp(-2 alpha (2W - x))
+        self.escape_front = self._exponentials(
+            [(a * b, 2., 0., 1.), (a * b * (1. - a), 2., 2. * width, -1.)])
 
-        self.escape_rear = a * b * (
-            np.exp(-xd_W) + c * np.exp(xd_W)
-        )
+        self.escape_rear = self._exponentials(
+            [(a * b, 2., width, -1.), (a * b * (1. - a), 2., width, 1.)])
 
         if ax is not None:
-            ax.plot(self.x,  (np.exp(-xd)), 'r')
-            ax.plot(self.x,  (c * np.exp(xd)), 'b')
-            ax.plot(self.x,  self.Escape_front, 'g')
-
-            # ax.plot(self.wavelength_emission, self._optics.abs_cof_bb)
-            # ax.plot(self.wavelength_emission, self._optics.n)
+            ax.plot(self.x,  self.escape_front, 'g')
 
     def double_side_polished(self, **kwargs):
         """
         This is taken from Schick1992 paper
         the reflectin values should be provided as a decimal not a fraction
         """
-
-        if kwargs:
-            self.calculationdetails = kwargs
-            self._update_links()
-
-        self.width_from_xlegnth()
+        self._prepare(kwargs)
         self.theta = 0  # This is for a polished sample
 
-        xd_rear = self._optics.abs_cof_bb * \
-            ((np.ones([self.x.shape[0], self._optics.abs_cof_bb.shape[0]]).T) *
-             (self._cal_dts['width'] - self.x)).T
-
-        b_rear = self._cal_dts['ref_front'] * \
-            np.exp(-2 * self._optics.abs_cof_bb * self._cal_dts['width'])
+        width = self._cal_dts['width']
+        ref_front = self._cal_dts['ref_front']
+        ref_rear = self._cal_dts['ref_rear']
 
-        xd_frot = self._optics.abs_cof_bb * \
-            (np.ones([self.x.shape[0], self._optics.abs_cof_bb.shape[0]]).T *
-             self.x).T
-        b_frot = self._cal_dts['ref_rear'] * \
-            np.exp(-2 * self._optics.abs_cof_bb * self._cal_dts['width'])
+        b_rear = ref_front * \
+            np.exp(-2 * self._optics.abs_cof_bb * width)
+        b_frot = ref_rear * \
+            np.exp(-2 * self._optics.abs_cof_bb * width)
 
-        self.escape_rear = (
-            np.exp(-xd_rear) + b_rear * np.exp(xd_rear)
-        ) / (1 - b_rear * self._cal_dts['ref_rear'])
+        # exp(-alpha (W - x)) + R_front exp(-alpha (W + x))
+        self.escape_rear = self._exponentials(
+            [(1. / (1 - b_rear * ref_rear), 1., width, -1.),
+             (ref_front / (1 - b_rear * ref_rear), 1., width, 1.)])
 
-        self.escape_front = (
-            np.exp(-xd_frot) + b_frot * np.exp(xd_frot)
-        ) / (1 - b_frot * self._cal_dts['ref_front'])
+        # exp(-alpha x) + R_rear exp(-alpha (2W - x))
+        self.escape_front = self._exponentials(
+            [(1. / (1 - b_frot * ref_front), 1., 0., 1.),
+             (ref_rear / (1 - b_frot * ref_front), 1., 2. * width, -1.)])
 
         # self._optics.abs_cof_bb*=cos(self.theta*np.pi/180)
 
-    def general_form(self):
+    def general_form(self, **kwargs):
         """
         Taken from
         C. Schinke, D. Hinken, J. Schmidt, K. Bothe, and R. Brendel, IEEE
@@ -155,6 +179,8 @@ class EscapeProbability(BaseModelClass):
         Please remember this is a 9 variable fit. it should always give a
          good fit
         """
+        self._prepare(kwargs)
+        width = self._cal_dts['width']
 
         # calculated from law of diffraction considering angle of entry
         # theta = gamma  - arcsin(n_air/n_si sin(gamma))
@@ -165,7 +191,7 @@ class EscapeProbability(BaseModelClass):
         thetan = np.pi / 3 * 0
 
         # these are defined as exp{-alpha W / cos(theta_x))}
-        T1 = np.exp(-self._optics.abs_cof_bb * self._cal_dts['width'] /
+        T1 = np.exp(-self._optics.abs_cof_bb * width /
                     np.cos(theta1))
         # print T1
         # experimentally this is taken as the average of T1 and Tn.
@@ -174,9 +200,9 @@ class EscapeProbability(BaseModelClass):
         # where:
         # Rbd is the rear surface reflection for lambertian reflected light a
         # Rbs is the rear surface reflectance for specular reflected light
-        T2 = np.exp(-self._optics.abs_cof_bb * self._cal_dts['width'] /
+        T2 = np.exp(-self._optics.abs_cof_bb * width /
                     np.cos(theta2))
-        Tn = np.exp(-self._optics.abs_cof_bb * self._cal_dts['width'] /
+        Tn = np.exp(-self._optics.abs_cof_bb * width /
                     np.cos(thetan))
 
         Rb1 = 0.0
@@ -208,24 +234,56 @@ class EscapeProbability(BaseModelClass):
 
         # print A, B, C, D
 
-        xd_W = self._optics.abs_cof_bb * \
-            ((np.ones([self.x.shape[0], self._optics.abs_cof_bb.shape[0]]).T) *
-             (self._cal_dts['width'] - self.x)).T
+        self.Escape_front = self._exponentials([
+            (scale * A, 1. / np.cos(theta1), 0., 1.),
+            (scale * B, 1. / np.cos(theta2), width, -1.),
+            (scale * C, 1. / np.cos(thetan), 0., 1.),
+            (scale * C * D, 1. / np.cos(thetan), width, -1.),
+        ])
 
-        xd = self._optics.abs_cof_bb * \
-            (np.ones([self.x.shape[0], self._optics.abs_cof_bb.shape[0]]).T *
-             self.x).T
 
-        self.Escape_front = scale * (
-            A * np.exp(-xd / np.cos(theta1)) +
-            B * np.exp(-xd_W / np.cos(theta2)) +
-            C * (np.exp(-xd / np.cos(thetan)) +
-                 D * np.exp(-xd_W / np.cos(thetan))
-                 )
-        )
+def benchmark(n_x=10**4, n_wavelength=10**3, dtype='float64',
+              max_memory=2**24):
+    '''
+    Times the escape probabilities of a polished wafer on a n_x by
+    n_wavelength grid, and measures the peak memory used.
+
+    output:
+        a dictionary of the run time (s), the peak memory (bytes) and the
+        size of the results (bytes)
+    '''
+    escape = EscapeProbability(x=np.linspace(0, 0.018, n_x), dtype=dtype,
+                               max_memory=max_memory)
+
+    # optics that span the tabulated range of alpha and n
+    escape._update_links()
+    optics = escape._optics
+    wavelength = np.linspace(optics.wavelength[0], optics.wavelength[-1],
+                             n_wavelength)
+    optics.abs_cof_bb = np.interp(wavelength, optics.wavelength,
+                                  optics.abs_cof_bb)
+    optics.ref_ind = np.interp(wavelength, optics.wavelength,
+                               optics.ref_ind)
+    optics.wavelength = wavelength
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    escape.double_side_polished()
+    run_time = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'time': run_time,
+        'peak_memory': peak,
+        'result_memory': escape.escape_front.nbytes +
+        escape.escape_rear.nbytes,
+        'grid': escape.escape_front.shape,
+    }
 
 
 if __name__ == "__main__":
+    plt = get_pyplot()
     a = EscapeProbability()
 
     a.double_side_polished(0, 0)
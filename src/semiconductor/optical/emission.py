@@ -1,5 +1,4 @@
 import numpy as np
-from matplotlib.pylab import *
 import sys
 import os
 import scipy.constants as const
@@ -8,6 +7,7 @@ import semiconductor.material.intrinsic_carrier_density as ni
 import semiconductor.optical.opticalproperties as opticalproperties
 import semiconductor.optical.absorptance as absorptance
 from semiconductor.helper.helper import BaseModelClass
+from semiconductor.helper import diagnostics
 
 import inspect
 
@@ -196,6 +196,9 @@ class luminescence_emission(BaseModelClass):
         doping=1e16,  # the doping in cm^-3
         )
 
+    _link_keys = ('wafer_opitcs', 'detection_side', 'material', 'temp',
+                  'width', 'ni_author', 'optics_k_author', 'optics_n_author')
+
     def __init__(self, **kwargs):
 
         self.calculationdetails = kwargs
@@ -203,7 +206,19 @@ class luminescence_emission(BaseModelClass):
         self._index = None
 
         self._update_x_dist()
-        self._update_links()
+        self._refresh_links()
+
+    def _link_values(self):
+        '''
+        The links also depend on the number of depth points and the
+        wavelengths selected, but not on the carrier profile itself.
+        '''
+        index = self._index
+        if index is not None:
+            index = index.tobytes()
+
+        return super(luminescence_emission, self)._link_values() + (
+            self._cal_dts['nxc'].shape, index)
 
     def _update_x_dist(self):
         '''
@@ -250,6 +265,9 @@ class luminescence_emission(BaseModelClass):
 
         self._update_escape()
 
+        # built from the escape probability when first needed
+        self._kernel = None
+
     def update_carrierdensity(self, deltan, doping=None):
         """
         inputs for carrier density
@@ -259,7 +277,7 @@ class luminescence_emission(BaseModelClass):
             self._cal_dts['doping'] = doping
 
         if deltan.shape != self.x.shape:
-            print('number of x-values not equal to delta n values')
+            diagnostics.warn('number of x-values not equal to delta n values')
 
         self.np = self._cal_dts['doping'] * deltan
 
@@ -284,6 +302,30 @@ class luminescence_emission(BaseModelClass):
             self._esc,
             self.PL_Dection_side_depth[self._cal_dts['detection_side']])
 
+    def escape_kernel(self, **kwargs):
+        """
+        Returns the kernel K[wavelength, x] that turns an excess carrier
+        profile into the spectral PL, PL = doping * K.dot(nxc).
+
+        The spontaneous emission, the escape probability and the
+        trapezoid weights of the x grid are folded in, so it only depends
+        on the optics, width and temperature. It is kept until one of
+        those changes.
+        """
+        if bool(kwargs):
+            self.calculationdetails = kwargs
+            self._update_x_dist()
+            self._refresh_links()
+
+        if self._kernel is None:
+            ni2 = self._sre._ni.update()**2
+            sre = self._sre.genralised_planks_PerWavelength_Carriers(ni2)
+
+            self._kernel = (sre * self._escapeprob).T * \
+                _trapz_weights(self._x) / ni2
+
+        return self._kernel
+
     def calculate_spectral(self, **kwargs):
         """
         deteries the spectral PL emitted from a sample
@@ -294,28 +336,94 @@ class luminescence_emission(BaseModelClass):
         if bool(kwargs):
             self.calculationdetails = kwargs
             self._update_x_dist()
-            self._update_links()
-
-        # cacualte the generated PL
-        sre = self._sre.genralised_planks_PerWavelength_Carriers(
-            self._sre._ni.update()**2)
+            self._refresh_links()
 
         # this is the spectral distribution from each point
         # Normalised to deltan = 1, so we can just multi this by deltan
         assert self._cal_dts['nxc'].shape == self._x.shape, (
             "nxc is different length to x spacing")
 
-        Spectral_PL = np.trapz(
-            (
-                (sre * self._escapeprob).T *
-                self._cal_dts['nxc'] *
-                self._cal_dts['doping'] /
-                self._sre._ni.update()**2),
-            self._x,
-            axis=1)
+        Spectral_PL = self.escape_kernel().dot(
+            self._cal_dts['nxc']) * self._cal_dts['doping']
 
         return Spectral_PL
 
+    def calculate_spectral_batch(self, nxc, doping=None, weights=None,
+                                 band=None, max_memory=2**26, **kwargs):
+        """
+        Calculates the PL from many excess carrier profiles on the same x
+        grid, e.g. every pixel of an image, as a matrix product with the
+        escape kernel.
+
+        inputs:
+            nxc: (array like)
+                of shape (profiles, x)
+            doping: (float or array like, optional)
+                the doping of all the profiles, or of each profile. The
+                doping in calculationdetails is used if None.
+            weights: (array like, optional)
+                of shape (wavelength,) or (filters, wavelength), e.g. the
+                transmission of a filter or a detector response. The
+                weighted spectra are integrated over wavelength.
+            band: (tuple, optional)
+                the smallest and largest wavelength in nm to integrate
+                over
+            max_memory: (int)
+                the largest number of bytes of the profiles converted to
+                float, or of the spectra, at a time
+
+        output:
+            the spectral PL, of shape (profiles, wavelength), or if
+            weights or a band are given the integrated signal, of shape
+            (profiles,) or (profiles, filters)
+        """
+        self.calculationdetails = kwargs
+
+        # the x grid is set by the number of points in the profiles
+        if np.shape(nxc)[-1] != self._x.shape[0]:
+            self._cal_dts['nxc'] = np.ones(np.shape(nxc)[-1])
+            self._update_x_dist()
+        self._refresh_links()
+
+        if doping is None:
+            doping = self._cal_dts['doping']
+        doping = np.asarray(doping, dtype=float)
+
+        kernel = self.escape_kernel()
+
+        # integrate the kernel over wavelength first if possible
+        if weights is not None or band is not None:
+            wavelength = self._optics.wavelength
+            if weights is None:
+                weights = np.ones(wavelength.shape)
+            weights = np.asarray(weights, dtype=float)
+
+            if band is not None:
+                weights = weights * (
+                    (wavelength >= band[0]) & (wavelength <= band[1]))
+
+            kernel = (weights * _trapz_weights(wavelength)).dot(kernel)
+
+        kernel = np.atleast_2d(kernel).T
+        n_profiles = np.shape(nxc)[0]
+
+        PL = np.empty((n_profiles, kernel.shape[1]))
+        rows = max(1, max_memory // (8 * max(kernel.shape)))
+
+        for start in range(0, n_profiles, rows):
+            stop = min(start + rows, n_profiles)
+            PL[start:stop] = np.asarray(
+                nxc[start:stop], dtype=float).dot(kernel)
+
+        if doping.ndim == 1:
+            doping = doping[:, None]
+        PL *= doping
+
+        if weights is not None and np.ndim(weights) == 1:
+            PL = PL[:, 0]
+
+        return PL
+
     def calculate_emitted(self, **kwargs):
         """
         multiples the detected PL by an EQE
@@ -323,3 +431,14 @@ class luminescence_emission(BaseModelClass):
         """
         spectral = self.calculate_spectral(**kwargs)
         return np.trapz(spectral, self._optics.wavelength)
+
+
+def _trapz_weights(x):
+    '''
+    the weights that give the trapezoid integral over x as a dot product
+    '''
+    dx = np.diff(x)
+    weights = np.zeros(x.shape)
+    weights[:-1] += dx / 2.
+    weights[1:] += dx / 2.
+    return weights
@@ -1,9 +1,137 @@
 import numpy as np
 import configparser
+import hashlib
 import os
-import sys
+import re
+import threading
+from collections import OrderedDict
 import scipy.constants as const
-from semiconductor.helper.helper import BaseModelClass
+from semiconductor.helper.helper import BaseModelClass, model_registry
+from semiconductor.helper import diagnostics
+
+# the tabulated data, and the values derived from them for each
+# (material, author, temperature), shared by every instance in the process.
+# The derived values are kept for the most recently used keys only, as
+# each distinct temperature adds one.
+_tables = {}
+_properties = OrderedDict()
+_max_properties = 64
+_store_lock = threading.Lock()
+
+
+def cache_dir():
+    '''
+    Returns the folder the compiled tables are written to. This is
+    $SEMICONDUCTOR_CACHE if set, otherwise a semiconductor folder in the
+    user's cache directory.
+    '''
+    folder = os.environ.get('SEMICONDUCTOR_CACHE')
+    if folder:
+        return folder
+
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or \
+            os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'semiconductor')
+
+
+def _compiled_name(fname):
+    '''
+    the compiled file of a csv, unique to its path so several installs
+    can share the cache
+    '''
+    digest = hashlib.sha1(fname.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(
+        cache_dir(), '{0}.{1}.npy'.format(os.path.basename(fname), digest))
+
+
+def load_table(fname):
+    '''
+    Returns a tabulated optical data file as a read only structured array.
+
+    The csv is compiled to a binary .npy file in the cache directory (see
+    cache_dir) the first time it is used, or when the csv is newer, and
+    that file is then memory mapped. All the processes using the data
+    share the one copy, and after the first load in a process the table is
+    returned from memory. The install itself is never written to, and if
+    the cache can not be written the table is just kept in memory.
+
+    inputs:
+        fname: (str)
+            the path to the csv file
+    '''
+    fname = os.path.realpath(fname)
+
+    with _store_lock:
+        if fname in _tables:
+            return _tables[fname]
+
+    compiled = _compiled_name(fname)
+    try:
+        if os.stat(compiled).st_mtime_ns < os.stat(fname).st_mtime_ns:
+            raise OSError('the compiled table is out of date')
+        data = np.load(compiled, mmap_mode='r')
+    except (OSError, ValueError):
+        data = np.genfromtxt(fname, names=True, delimiter=',')
+        try:
+            os.makedirs(os.path.dirname(compiled), exist_ok=True)
+            # written to a temporary file first, so other processes never
+            # see part of a table
+            temporary = '{0}.{1}.tmp'.format(compiled, os.getpid())
+            with open(temporary, 'wb') as f:
+                np.save(f, data)
+            os.replace(temporary, compiled)
+            data = np.load(compiled, mmap_mode='r')
+        except OSError:
+            data.flags.writeable = False
+
+    with _store_lock:
+        _tables[fname] = data
+    return data
+
+
+def compile_tables(material=None):
+    '''
+    Compiles all the tabulated optical data of a material, or of all
+    materials if none is given, into the cache directory, e.g. before
+    starting many worker processes.
+    '''
+    folder = os.path.dirname(os.path.realpath(__file__))
+    materials = [material] if material else os.listdir(folder)
+
+    for material in materials:
+        for author_file in (TabulatedAbsorptionCoefficient.author_file,
+                            TabulatedRefractiveIndex.author_file):
+            author_file = os.path.join(folder, material, author_file)
+            if not os.path.isfile(author_file):
+                continue
+
+            for author, vals in model_registry.load(author_file).items():
+                fname = os.path.join(folder, material, vals['model'])
+                if author != 'default' and os.path.isfile(fname):
+                    load_table(fname)
+
+
+def _cached_properties(key, calculate):
+    '''
+    Returns the properties for key, calculating them the first time
+    '''
+    with _store_lock:
+        if key in _properties:
+            _properties.move_to_end(key)
+            return _properties[key]
+
+    properties = calculate()
+    for value in properties.values():
+        value.flags.writeable = False
+
+    with _store_lock:
+        _properties[key] = properties
+        while len(_properties) > _max_properties:
+            _properties.popitem(last=False)
+    return properties
 
 
 class TabulatedOpticalProperties(BaseModelClass):
@@ -18,10 +146,12 @@ class TabulatedOpticalProperties(BaseModelClass):
         'ext_cof': False
     }
 
+    _link_keys = ('material', 'abs_author', 'ref_author')
+
     def __init__(self, **kwargs):
 
         self.calculationdetails = kwargs
-        self._update_links()
+        self._refresh_links()
         self.load()
 
     def _update_links(self):
@@ -37,15 +167,15 @@ class TabulatedOpticalProperties(BaseModelClass):
                 author=self._cal_dts['ref_author'],
                 temp=self._cal_dts['temp'],
             )
-        except:
-            print(sys.exc_info()[0])
-            sys.exit('No reactive index data found')
+        except Exception as error:
+            raise ValueError(
+                'No refractive index data found: {0!r}'.format(error))
 
     def load(self, common_range=True, **kwargs):
         self.calculationdetails = kwargs
 
-        if 'author' or 'material' in ''.join(kwargs.keys()):
-            self._update_links()
+        # only rebuilds the links if the material or an author changed
+        self._refresh_links()
 
         try:
             self.tri.load(temp=self._cal_dts['temp'])
@@ -83,6 +213,33 @@ class TabulatedOpticalProperties(BaseModelClass):
 
         pass
 
+    def at_temps(self, temps, **kwargs):
+        '''
+        Returns alpha and n on a (temperature, wavelength) grid, both at
+        the wavelengths of alpha.
+
+        inputs:
+            temps: (array like Kelvin)
+
+        output:
+            wavelength: (array nm)
+            alpha: (array cm^-1)
+                of shape (temps, wavelength)
+            n: (array)
+                of shape (temps, wavelength)
+        '''
+        self.calculationdetails = kwargs
+        self._refresh_links()
+
+        alpha = self.tac.alpha_at_temps(temps)
+        ref_ind = self.tri.ref_ind_at_temps(temps)
+
+        ref_ind = np.array([
+            np.interp(self.tac.wavelength, self.tri.wavelength, row)
+            for row in ref_ind])
+
+        return self.tac.wavelength, alpha, ref_ind
+
 
 class TabulatedAbsorptionCoefficient(BaseModelClass):
 
@@ -129,63 +286,73 @@ class TabulatedAbsorptionCoefficient(BaseModelClass):
         if 'author' in kwargs.keys():
             self.change_model(self._cal_dts['author'])
 
+        properties = _cached_properties(
+            ('alpha', self._cal_dts['material'], self._cal_dts['author'],
+             float(self._cal_dts['temp'])), self._calculate)
+
+        self.wavelength = properties['wavelength']
+        self.energy = properties['energy']
+        self.abs_cof_bb = properties['alpha']
+
+        # the uncertainty, if there is one
+        if 'U' in properties:
+            self.U = properties['U']
+
+    def _calculate(self):
+        '''
+        Calculates alpha at the temperature from the tabulated data
+        '''
         # Getting the absorption coefficient from a file
-        data = np.genfromtxt(os.path.join(os.path.dirname(__file__),
-                                          self._cal_dts['material'],
-                                          self.model),
-                             names=True, delimiter=',')
+        data = load_table(os.path.join(os.path.dirname(__file__),
+                                       self._cal_dts['material'],
+                                       self.model))
 
         # need something here to get temp dependence
-        self.wavelength, self.energy = data[
-            'wavelength'], data['energy']
-
-        # if the temp is a float
-        if type(self.vals['temp']) is float:
-            self.abs_cof_bb = data['alpha']
-            if self._cal_dts['temp'] != self.vals['temp']:
-                try:
-                    self.abs_cof_bb = _temp_power_law(self.abs_cof_bb,
-                                                      data['C_ka'],
-                                                      self._cal_dts['temp'],
-                                                      self.vals['temp'])
-                except:
-                    print(
-                        '''Warning:'''
-                        '''\n\tNo tabulated data, or temp cofs for'''
-                        ''' {0:.0f} K'''.format(self._cal_dts['temp']) +
-                        '''\tfor the author {0}'''.format(
-                            self._cal_dts['author']) +
-                        '\tusing data for temperature {0:.0f} K.'.format(
-                            self.vals['temp'])
-                    )
+        properties = {
+            'wavelength': np.array(data['wavelength']),
+            'energy': np.array(data['energy']),
+        }
 
-        else:
+        properties['alpha'] = _temperature_table(
+            data, 'alpha', 'C_ka', [self._cal_dts['temp']], self.vals,
+            self._cal_dts['author'])[0]
 
-            # this happens when there are several alpha values, so lets try a
-            # specif temp
-            name = 'alpha_{0:.0f}K'.format(self._cal_dts['temp'])
-            if name in data.dtype.names:
-                self.abs_cof_bb = data[name]
-            else:
-                # if doesn't work just use the stipulated default
-                print(
-                    'Warning:'
-                    '\n\tTabulated data at {0} K does not exist.'.format(
-                        self._cal_dts['temp']) +
-                    '\n\tfor the author {0}'.format(
-                        self._cal_dts['author']) +
-                    '\n\tThe value for', self.vals['default_temp'],
-                    'K is used'
-                )
-                name = 'alpha_{0:.0f}K'.format(self.vals['default_temp'])
-                self.abs_cof_bb = data[name]
+        # try to get the uncertainty
+        if 'U' in data.dtype.names:
+            properties['U'] = np.array(data['U'])
 
-        try:
-            # try to get the uncertainty
-            self.U = data['U']
+        return properties
 
-        except:
-            pass
+    def alpha_at_temps(self, temps, **kwargs):
+        '''
+        Returns alpha at several temperatures.
+
+        Datasets with several temperatures are interpolated between the
+        tabulated ones, otherwise the C_ka power law is used when the data
+        has it. The result is cached.
+
+        inputs:
+            temps: (array like Kelvin)
+
+        output:
+            alpha: (array cm^-1)
+                of shape (temps, wavelength), at self.wavelength
+        '''
+        self.load(**kwargs)
+
+        temps = np.atleast_1d(np.asarray(temps, dtype=float))
+
+        def calculate():
+            data = load_table(os.path.join(os.path.dirname(__file__),
+                                           self._cal_dts['material'],
+                                           self.model))
+            return {'alpha': _temperature_table(
+                data, 'alpha', 'C_ka', temps, self.vals,
+                self._cal_dts['author'])}
+
+        return _cached_properties(
+            ('alpha', self._cal_dts['material'], self._cal_dts['author'],
+             temps.tobytes()), calculate)['alpha']
 
     def alphaBB_at_wls(self, wavelength):
         return np.interp(wavelength,
@@ -243,29 +410,62 @@ class TabulatedRefractiveIndex(BaseModelClass):
         # there there are use them
         # if nothing return the default temp value.
 
+        properties = _cached_properties(
+            ('n', self._cal_dts['material'], self._cal_dts['author'],
+             float(self._cal_dts['temp'])), self._calculate)
+
+        self.wavelength = properties['wavelength']
+        self.ref_ind = properties['n']
+        self.energy = properties['energy']
+
+    def _calculate(self):
+        '''
+        Calculates n at the temperature from the tabulated data
+        '''
         # Get n
-        data = np.genfromtxt(os.path.join(os.path.dirname(__file__),
-                                          self._cal_dts['material'],
-                                          self.model),
-                             names=True, delimiter=',')
+        data = load_table(os.path.join(os.path.dirname(__file__),
+                                       self._cal_dts['material'],
+                                       self.model))
 
-        self.wavelength, self.ref_ind, self.energy = data[
-            'wavelength'], data['n'], data['energy']
+        properties = {
+            'wavelength': np.array(data['wavelength']),
+            'energy': np.array(data['energy']),
+        }
 
-        if self._cal_dts['temp'] != self.vals['temp']:
-            try:
-                self.ref_ind = _temp_power_law(self.ref_ind, data['C_n'],
-                                               self._cal_dts['temp'],
-                                               self.vals['temp'])
-            except:
-                print(
-                    'Temp Warning:'
-                    '\tNo tabulated data, or temp cofs for {0:.0f} K'.format(
-                        self._cal_dts['temp']) +
-                    '\tfor the author {0}'.format(self._cal_dts['author']) +
-                    '\tusing data for temperature {0:.0f} K.'.format(
-                        self.vals['temp'])
-                )
+        properties['n'] = _temperature_table(
+            data, 'n', 'C_n', [self._cal_dts['temp']], self.vals,
+            self._cal_dts['author'])[0]
+
+        return properties
+
+    def ref_ind_at_temps(self, temps, **kwargs):
+        '''
+        Returns n at several temperatures, interpolated between the
+        tabulated temperatures or from the C_n power law. The result is
+        cached.
+
+        inputs:
+            temps: (array like Kelvin)
+
+        output:
+            n: (array)
+                of shape (temps, wavelength), at self.wavelength
+        '''
+        self.load(**kwargs)
+
+        temps = np.atleast_1d(np.asarray(temps, dtype=float))
+
+        def calculate():
+            data = load_table(os.path.join(os.path.dirname(__file__),
+                                           self._cal_dts['material'],
+                                           self.model))
+            return {'n': _temperature_table(
+                data, 'n', 'C_n', temps, self.vals,
+                self._cal_dts['author'])}
+
+        return _cached_properties(
+            ('n', self._cal_dts['material'], self._cal_dts['author'],
+             temps.tobytes()), calculate)['n']
 
     def ref_ind_at_wls(self, wavelength):
         '''
@@ -289,19 +489,108 @@ def _temp_power_law(ref_vairable, coef, temp, ref_temp):
     return ref_vairable * np.power(temp / ref_temp, coef * 1e-4 * ref_temp)
 
 
+def _temperature_table(data, name, coef, temps, vals, author):
+    '''
+    Returns the values of a tabulated property at each temperature, of
+    shape (temps, wavelength).
+
+    If the data has a column for several temperatures, e.g. alpha_300K,
+    the values are interpolated between them, linearly in their log where
+    they are positive. Otherwise the single column is used, scaled with
+    the power law coefficients in coef if the data has them.
+
+    inputs:
+        data: (structured array)
+            the tabulated data
+        name: (str)
+            the property, e.g. alpha or n
+        coef: (str)
+            the column of the power law coefficients, e.g. C_ka
+        temps: (array like Kelvin)
+        vals: (dict)
+            the author's values, with the temperature of the data
+        author: (str)
+            only used in warnings
+    '''
+    temps = np.asarray(temps, dtype=float)
+
+    # the columns for each temperature
+    columns = {}
+    for column in data.dtype.names:
+        match = re.match(r'^{0}_(\d+(?:\.\d+)?)K?$'.format(name), column)
+        if match:
+            columns[float(match.group(1))] = column
+
+    if not columns:
+        values = np.array(data[name])
+        table = np.repeat(values[None, :], temps.size, axis=0)
+
+        change = temps != vals['temp']
+        if np.any(change):
+            if coef in data.dtype.names:
+                table[change] = _temp_power_law(
+                    values[None, :], data[coef][None, :],
+                    temps[change][:, None], vals['temp'])
+            else:
+                diagnostics.warn(
+                    'No tabulated data, or temp cofs for %s K for the '
+                    'author %s, using data for temperature %.0f K.',
+                    temps[change], author, vals['temp'],
+                    key='{0} temp cofs'.format(name))
+        return table
+
+    tabulated = np.array(sorted(columns))
+    values = np.array([data[columns[temp]] for temp in tabulated])
+
+    outside = (temps < tabulated[0]) | (temps > tabulated[-1])
+    if np.any(outside):
+        diagnostics.warn(
+            'The temperatures %s K are outside the tabulated range of the '
+            'author %s, the closest tabulated temperature is used.',
+            temps[outside], author, key='{0} temp range'.format(name))
+
+    if tabulated.size == 1:
+        return np.repeat(values, temps.size, axis=0)
+
+    # the tabulated temperatures either side
+    upper = np.clip(np.searchsorted(tabulated, temps), 1, tabulated.size - 1)
+    weight = np.clip((temps - tabulated[upper - 1]) /
+                     (tabulated[upper] - tabulated[upper - 1]), 0., 1.)[:, None]
+    low, high = values[upper - 1], values[upper]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        table = np.where(
+            (low > 0) & (high > 0),
+            np.exp((1. - weight) * np.log(low) + weight * np.log(high)),
+            (1. - weight) * low + weight * high)
+
+    # exactly the tabulated values at the tabulated temperatures
+    table = np.where(weight == 0., low, np.where(weight == 1., high, table))
+
+    return table
+
+
 class ModelledAbsorptionCoefficient(BaseModelClass):
 
     ''' This purpose of this it to provide access if the absorption
         coefficient have a model.
         This is a work in progress.
+
+        The phonon assisted models are evaluated in one pass, broadcast
+        over the temperature, photon energy, band gaps and phonon
+        branches, so alpha can be found at many temperatures at once.
     '''
     beta = 0
     gamma = 0
 
+    # the number of band gap arrays kept, for the most recent temperatures
+    _max_gaps = 16
+
     _cal_dts = {
         'material': 'Si',
         'temp': 300.,
         'author': None,
+        'cache_gaps': True,
     }
 
     author_file = 'modelled_absorption_coefficient.const'
@@ -316,7 +605,7 @@ class ModelledAbsorptionCoefficient(BaseModelClass):
         author_file = os.path.join(
             os.path.dirname(os.path.realpath(__file__)),
             self._cal_dts['material'],
-            self.author_list)
+            self.author_file)
 
         # get the models ready
         self._int_model(author_file)
@@ -324,6 +613,37 @@ class ModelledAbsorptionCoefficient(BaseModelClass):
         # initiate the first model
         self.change_model(self._cal_dts['author'])
 
+        # the band gaps at the most recently used temperatures
+        self._gaps = OrderedDict()
+
+    def update(self, energy, **kwargs):
+        '''
+        Returns the absorption coefficient
+
+        inputs:
+            energy: (array like eV)
+                the photon energies
+            temp: (float or array like Kelvin, optional)
+                the temperatures
+
+        returns:
+            absorption coefficients in cm^-1, of shape (temp, energy), or
+            (energy,) for a single temperature
+        '''
+        self.calculationdetails = kwargs
+
+        # a check to make sure the model hasn't changed
+        if 'author' in kwargs.keys():
+            self.change_model(self._cal_dts['author'])
+
+        energy = np.asarray(energy, dtype=float)
+        temp = np.asarray(self._cal_dts['temp'], dtype=float)
+
+        alpha = getattr(self, self.model)(
+            self.vals, energy.ravel(), np.atleast_1d(temp))
+
+        return alpha.reshape(temp.shape + energy.shape)
+
     def update_absorptioncoefficients(self, f=None, Input=None):
         '''
         updates the absorption coefficients
@@ -339,9 +659,11 @@ class ModelledAbsorptionCoefficient(BaseModelClass):
             f = self.f
         else:
             if Input == 'wavelength':
-                f = self._wavelength2frequency(wavelength)
+                f = self._wavelength2frequency(f)
+            else:
+                self.f = f
 
-        self.alpha = getattr(self, self.model)(self.vals, f)
+        self.alpha = self.update(const.h * np.asarray(f) / const.e)
 
         return self.alpha
 
@@ -351,7 +673,84 @@ class ModelledAbsorptionCoefficient(BaseModelClass):
 
         if gamma is None:
             gamma = self.gamma
-        return Eg - beta * T**2 / (T + gamma)
+
+        if not self._cal_dts['cache_gaps']:
+            return Eg - beta * T**2 / (T + gamma)
+
+        Eg = np.asarray(Eg, dtype=float)
+        T = np.asarray(T, dtype=float)
+        key = (Eg.shape, Eg.tobytes(), T.shape, T.tobytes(), beta, gamma)
+
+        if key in self._gaps:
+            self._gaps.move_to_end(key)
+        else:
+            self._gaps[key] = Eg - beta * T**2 / (T + gamma)
+            while len(self._gaps) > self._max_gaps:
+                self._gaps.popitem(last=False)
+        return self._gaps[key]
+
+    def _phonon_assisted(self, energy, temp, gaps, gap_coefs, phonons,
+                         phonon_coefs, emission_factor=False):
+        '''
+        The absorption by indirect transitions, summed over the band gaps
+        and phonon branches,
+
+            sum A_g C_p [N (E - Eg(T) + Ep)^2 + (N + 1) (E - Eg(T) - Ep)^2]
+
+        where N is the phonon occupation at T. This is broadcast over the
+        axes (temp, energy, gap, phonon).
+
+        inputs:
+            energy: (array eV) of shape (energy,)
+            temp: (array Kelvin) of shape (temp,)
+            gaps, gap_coefs: (array) the band gaps (eV) and their coefficients
+            phonons, phonon_coefs: (array) the phonon energies (eV) and
+                their coefficients
+            emission_factor: (bool)
+                if the emission is further weighted by exp(Ep/kT)
+
+        returns:
+            alpha of shape (temp, energy)
+        '''
+        T = temp[:, None, None, None]
+        E = energy[None, :, None, None]
+        Ep = np.asarray(phonons, dtype=float)[None, None, None, :]
+
+        # the gaps at each temperature, (temp, 1, gap, 1)
+        Eg = self._EgwithT(np.asarray(gaps, dtype=float)[None, :],
+                           temp[:, None])[:, None, :, None]
+
+        coef = np.asarray(gap_coefs, dtype=float)[:, None] * \
+            np.asarray(phonon_coefs, dtype=float)[None, :]
+
+        x = Ep * const.e / const.k / T
+        occupation = 1. / np.expm1(x)
+        absorption = coef * occupation
+        emission = coef * (occupation + 1.)
+        if emission_factor:
+            emission = emission * np.exp(x)
+
+        alpha = absorption * np.maximum(E - Eg + Ep, 0.)**2 + \
+            emission * np.maximum(E - Eg - Ep, 0.)**2
+
+        return np.sum(alpha, axis=(2, 3))
+
+    def _direct(self, energy, temp, gap, coef, power=0.5):
+        '''
+        The absorption by a direct transition, of shape (temp, energy)
+        '''
+        Eg = self._EgwithT(np.asarray(gap, dtype=float),
+                           temp)[:, None]
+        return coef * np.maximum(energy[None, :] - Eg, 0.)**power
+
+    def _values(self, vals, prefix):
+        '''
+        The values whose name is prefix followed by a number, in order
+        '''
+        names = sorted(name for name in vals
+                       if name.startswith(prefix) and
+                       name[len(prefix):].isdigit())
+        return np.array([vals[name] for name in names], dtype=float)
 
     def _checkf(self, f):
         if f is None:
@@ -430,83 +829,57 @@ class ModelledAbsorptionCoefficient(BaseModelClass):
             alpha_in += self.alpha_p_emission(Eg, Ep, Ae, T)
         return alpha_in
 
-    def MacFarlane(self, vals, f):
-
-        # Eg = vals['egi']
+    def MacFarlane(self, vals, energy, temp):
 
-        Egi_list = [vals[s] for s in vals if 'egi' in s]
-        Ep_list = [vals[s] / 1000 for s in vals if 'ep' in s]
-        Ap_list = [vals[s.replace('e', 'a')] for s in vals if 'ep' in s]
+        self.gamma = vals.get('gamma', 0.)
+        self.beta = vals.get('beta', 0.)
 
-        Egd_list = [vals[s] for s in vals if 'egd' in s]
-        Ad_list = [vals[s.replace('e', 'a')] for s in vals if 'ad' in s]
+        # the TA and TO phonons, in meV
+        names = [name for name in vals if name.startswith('ep')]
+        phonons = np.array([vals[name] for name in names]) / 1000.
+        coefs = [vals[name.replace('e', 'a', 1)] for name in names]
 
-        # print Ep_list, Ap_list
-        alpha = np.zeros(self.f.shape)
+        gaps = [vals[name] for name in vals if name.startswith('egi')]
 
-        for Eg in Egi_list:
-            # print Eg
-            alpha += self.alpha_indirect(Eg, Ep_list, Ap_list, 300.)
+        # the change in phonon absorption probability between emission and
+        # absorption is just e^{E_p / kt}, taken from MacFarlane
+        alpha = self._phonon_assisted(energy, temp, gaps, np.ones(len(gaps)),
+                                      phonons, coefs, emission_factor=True)
 
-        for Eg in Egd_list:
-            alpha += self.alpha_direct(Eg, Ad_list)
+        for name in vals:
+            if name.startswith('egd'):
+                alpha += self._direct(energy, temp, vals[name], vals['ad'])
 
         return alpha
 
-    def Rajkanan(self, vals, f):
+    def Rajkanan(self, vals, energy, temp):
         # Based on indirect theory from Elliot
 
-        # print vals
         self.gamma = vals['gamma']
         self.beta = vals['beta']
 
-        Egi_list = [vals[s] for s in vals if 'egi' in s]
-        Ep_list = [vals[s] / 1000 for s in vals if 'ep' in s]
-        Ap_list = [vals[s.replace('e', 'a')] for s in vals if 'ap' in s]
-        C_list = [vals[s.replace('e', 'a')] for s in vals if 'c' in s]
-
-        Egd_list = [vals[s] for s in vals if 'egd' in s]
-        Ad_list = [vals[s.replace('e', 'a')] for s in vals if 'ad' in s]
-
-        alpha = np.zeros(self.f.shape)
-        T = 300.
-        for Eg, Ap in zip(Egi_list, Ap_list):
-            for Ep, C in zip(Ep_list, C_list):
+        alpha = self._phonon_assisted(
+            energy, temp, self._values(vals, 'egi'), self._values(vals, 'ap'),
+            self._values(vals, 'ep') / 1000., self._values(vals, 'c'))
 
-                alpha += self.alpha_p_absorption(Eg, Ep, Ap * C, T)
-                alpha += self.alpha_p_emission(Eg, Ep, Ap * C, T)
-
-        for Eg in Egd_list:
-            alpha += self.alpha_direct(Eg, Ad_list)
+        alpha += self._direct(energy, temp, vals['egd'], vals['ad'])
 
         return alpha
 
-    def Bucher(self, vals, f):
+    def Bucher(self, vals, energy, temp):
         # Based on indirect theory from Elliot
 
-        # print vals
         self.gamma = vals['gamma']
         self.beta = vals['beta']
 
-        Egi_list = [vals[s] for s in vals if 'egi' in s]
-        Ep_list = [vals[s] / 1000 for s in vals if 'ep' in s]
-        Ap_list = [vals[s.replace('e', 'a')] for s in vals if 'ap' in s]
-        C_list = [vals[s.replace('e', 'a')] for s in vals if 'c' in s]
-
-        Egd_list = [vals[s] for s in vals if 'egd' in s]
-        Ad_list = [vals[s.replace('e', 'a')] for s in vals if 'ad' in s]
-
-        alpha = np.zeros(self.f.shape)
-        T = 300.
-        for Eg, Ap in zip(Egi_list, Ap_list):
-            for Ep, C in zip(Ep_list, C_list):
-                alpha += self.alpha_p_absorption(Eg, Ep, Ap * C, T)
-                alpha += self.alpha_p_emission(Eg, Ep, Ap * C, T)
-
-        power = vals['power']
+        alpha = self._phonon_assisted(
+            energy, temp, self._values(vals, 'egi'), self._values(vals, 'ap'),
+            self._values(vals, 'ep') / 1000., self._values(vals, 'c'))
 
-        for Eg in Egd_list:
-            alpha += self.alpha_direct(Eg,
-                                       Ad_list[0] / const.h / f * const.e, 1.5)
+        # the direct transition, with a probability that falls with energy.
+        # This uses the model's power of 1.5; older versions passed it as
+        # the temperature, giving a power of 0.5.
+        alpha += self._direct(energy, temp, vals['egd'], vals['ad'],
+                              vals['power']) / energy
 
         return alpha
@@ -2,3 +2,6 @@
 
 from .intrinsic import Intrinsic, Radiative, Auger
 from .extrinsic import SRH
+from .effective_lifetime import EffectiveLifetime
+from .tidls import TIDLS
+from .implied import Implied
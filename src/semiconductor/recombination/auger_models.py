@@ -8,7 +8,7 @@ def none(vals, nxc, *args, **kwargs):
     '''
     Returns an infinite lifetime
     '''
-    return np.ones(nxc.shape[0]) * np.inf
+    return np.ones(np.shape(nxc)) * np.inf
 
 
 def auger_dopants(vals, nxc, ne0, nh0, **args):
@@ -79,12 +79,11 @@ def coulomb_enhanced_auger_Altermatt(vals, nxc, ne0, nh0, temp):
         ((nh / vals['K_ehh'])**vals['p_ehh'])))
 
     # Cn can be considered temp independent for 70 - 400K
-    Cn = vals['K_n']
-    Cn *= g_eeh
+    Cn = vals['K_n'] * g_eeh
 
     # Ch can not
-    Ch = vals['K_h0'] + vals['K_h1'] * temp + vals['K_h2'] * temp**2
-    Ch *= g_ehh
+    Ch = (vals['K_h0'] + vals['K_h1'] * temp + vals['K_h2'] * temp**2) * \
+        g_ehh
 
     # the auger recombination rate is given by
     R = Cn * (ne**2 * nh - ne0**2 * nh0) + \
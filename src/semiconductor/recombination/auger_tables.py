@@ -0,0 +1,333 @@
+'''
+Tabulated Auger lifetimes.
+
+log10(tau) is precomputed on a uniform grid in log10(doping) and
+log10(nxc), for each dopant type, and interpolated with a tensor product
+monotone (pchip) cubic Hermite. The grid is refined until the largest
+relative error found against the analytic model, on a sub grid of points
+spread over every cell, is below the requested tolerance. This is a
+sampled, not a proven, bound, and is reported as max_error.
+'''
+
+import math
+import threading
+from collections import OrderedDict
+import numpy as np
+
+from semiconductor.general_functions.carrierfunctions import get_carriers
+from semiconductor.recombination import auger_models as augmdls
+
+# the tables are a few MB each, so only the most recently used are kept
+_tables = OrderedDict()
+_max_tables = 16
+_tables_lock = threading.Lock()
+_ln10 = math.log(10.)
+# one lock per table being built, so different tables build in parallel
+_build_locks = {}
+
+
+def _pchip_slopes(f, axis):
+    '''
+    The monotone slopes of f along axis, per grid step, for a uniform grid
+    '''
+    f = np.moveaxis(f, axis, 0)
+    d = np.diff(f, axis=0)
+
+    m = np.zeros(f.shape)
+
+    # the harmonic mean of the neighbouring differences, where they agree
+    same = d[:-1] * d[1:] > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        m[1:-1] = np.where(same, 2. / (1. / d[:-1] + 1. / d[1:]), 0.)
+
+    # one sided at the ends, limited to keep the monotonicity
+    for end, d0, d1 in [(0, d[0], d[1]), (-1, d[-1], d[-2])]:
+        m_end = (3. * d0 - d1) / 2.
+        m_end = np.where(np.sign(m_end) != np.sign(d0), 0., m_end)
+        m_end = np.where((np.sign(d0) != np.sign(d1)) &
+                         (np.abs(m_end) > np.abs(3. * d0)), 3. * d0, m_end)
+        m[end] = m_end
+
+    return np.moveaxis(m, 0, axis)
+
+
+class HermiteTable():
+    '''
+    A tensor product cubic Hermite interpolation on a uniform 2D grid.
+
+    The Hermite data of every cell is turned into the coefficients of a
+    bicubic polynomial, so a lookup is an index calculation, a gather of
+    the coefficients and a Horner evaluation.
+
+    inputs:
+        x, y: (array)
+            uniformly spaced grid points
+        f: (array)
+            of shape (x.size, y.size)
+    '''
+
+    # maps (value at 0, value at 1, slope at 0, slope at 1) to the
+    # polynomial coefficients of a unit interval
+    _hermite = np.array([[1., 0., 0., 0.],
+                         [0., 0., 1., 0.],
+                         [-3., 3., -2., -1.],
+                         [2., -2., 1., 1.]])
+
+    def __init__(self, x, y, f):
+        self.x0, self.dx, self.nx = x[0], x[1] - x[0], x.size
+        self.y0, self.dy, self.ny = y[0], y[1] - y[0], y.size
+
+        fx = _pchip_slopes(f, 0)
+        fy = _pchip_slopes(f, 1)
+        fxy = _pchip_slopes(fx, 1)
+
+        # the Hermite data of each cell, (cell x, cell y, 4, 4)
+        G = np.empty((self.nx - 1, self.ny - 1, 4, 4))
+        for a, (gv, gs) in enumerate([(f, fy), (fx, fxy)]):
+            for b in range(2):
+                rows = slice(b, b + self.nx - 1)
+                G[:, :, 2 * a + b, 0] = gv[rows, :-1]
+                G[:, :, 2 * a + b, 1] = gv[rows, 1:]
+                G[:, :, 2 * a + b, 2] = gs[rows, :-1]
+                G[:, :, 2 * a + b, 3] = gs[rows, 1:]
+
+        # the polynomial coefficients, A[..., p, q] of u^p v^q
+        A = np.einsum('pi,xyij,qj->xypq', self._hermite, G, self._hermite)
+        self._coefs = [[np.ascontiguousarray(A[:, :, p, q]).ravel()
+                        for q in range(4)] for p in range(4)]
+        self._rows = {}
+
+        self.x1 = self.x0 + self.dx * (self.nx - 1)
+        self.y1 = self.y0 + self.dy * (self.ny - 1)
+
+    def in_range(self, x, y):
+        return (x >= self.x0) & (x <= self.x1) & \
+            (y >= self.y0) & (y <= self.y1)
+
+    def _row(self, x):
+        '''
+        the coefficients in v at a single x, one array per power of v,
+        cached as the doping of a calculator rarely changes
+        '''
+        row = self._rows.get(x)
+        if row is None:
+            u = (x - self.x0) / self.dx
+            i = min(max(int(math.floor(u)), 0), self.nx - 2)
+            u = u - i
+            cells = slice(i * (self.ny - 1), (i + 1) * (self.ny - 1))
+            row = [np.ascontiguousarray(
+                sum(self._coefs[p][q][cells] * u**p for p in range(4)))
+                for q in range(4)]
+            self._rows[x] = row
+        return row
+
+    def __call__(self, x, y):
+        '''
+        interpolates at the points (x, y), which must be in range
+        '''
+        v = (np.asarray(y, dtype=float) - self.y0) / self.dy
+
+        # O(1) indexing on the uniform grid, v is not negative in range
+        j = v.astype(np.intp)
+        np.clip(j, 0, self.ny - 2, out=j)
+        v -= j
+
+        # for a single x only the polynomial in v is needed, evaluated in
+        # place with 1D gathers, which are much faster than a 2D one
+        if np.ndim(x) == 0:
+            c = self._row(float(x))
+            result = c[3].take(j)
+            for q in (2, 1, 0):
+                result *= v
+                result += c[q].take(j)
+            return result
+
+        u = (np.asarray(x) - self.x0) / self.dx
+        i = np.clip(np.floor(u).astype(int), 0, self.nx - 2)
+        u = u - i
+        k = i * (self.ny - 1) + j
+
+        result = 0.
+        for p in range(3, -1, -1):
+            c = [np.take(self._coefs[p][q], k) for q in range(4)]
+            result = result * u + \
+                (((c[3] * v + c[2]) * v + c[1]) * v + c[0])
+        return result
+
+
+class AugerTable():
+    '''
+    The tabulated lifetime of one Auger model at one temperature.
+
+    inputs:
+        model: (str)
+            the function in auger_models
+        vals: (dict)
+            the model's parameters
+        temp: (float)
+            the temperature in Kelvin
+        material, ni_author: (str)
+            used to get the equilibrium carriers
+        log_doping, log_nxc: (tuple)
+            the range of the grid in log10(|cm-3|)
+        tolerance: (float)
+            the largest relative error of the interpolated lifetime, found
+            on check_points x check_points points in every cell
+        points_per_decade: (int)
+            the density of the first grid, doubled until the tolerance is
+            met or max_points_per_decade is reached
+        check_points: (int)
+            the number of points along each axis of a cell at which the
+            error is checked
+    '''
+
+    def __init__(self, model, vals, temp, material='Si', ni_author=None,
+                 log_doping=(12., 20.), log_nxc=(10., 19.), tolerance=1e-4,
+                 points_per_decade=8, max_points_per_decade=64,
+                 check_points=4):
+
+        self.model = model
+        self.vals = vals
+        self.temp = temp
+        self.material = material
+        self.ni_author = ni_author
+        self.tolerance = tolerance
+
+        while True:
+            x = np.linspace(log_doping[0], log_doping[1], int(
+                (log_doping[1] - log_doping[0]) * points_per_decade) + 1)
+            y = np.linspace(log_nxc[0], log_nxc[1], int(
+                (log_nxc[1] - log_nxc[0]) * points_per_decade) + 1)
+
+            self.tables = {}
+            self.max_error = 0.
+            for dopant_type in ('p', 'n'):
+                f = self._log_tau(x[:, None], y[None, :], dopant_type)
+
+                # e.g. an infinite lifetime, just use the model
+                if not np.all(np.isfinite(f)):
+                    self.tables = None
+                    self.max_error = None
+                    return
+
+                self.tables[dopant_type] = HermiteTable(x, y, f)
+
+                # check the error over each cell, at evenly spread points
+                # that include its edges
+                offsets = np.arange(check_points) / check_points
+                xm = (x[:-1, None] + offsets * (x[1] - x[0])).ravel()
+                ym = (y[:-1, None] + offsets * (y[1] - y[0])).ravel()
+                xm, ym = np.append(xm, x[-1]), np.append(ym, y[-1])
+                for xs in np.array_split(xm, max(1, xm.size // 64)):
+                    error = np.abs(10**(
+                        self.tables[dopant_type](xs[:, None], ym[None, :]) -
+                        self._log_tau(xs[:, None], ym[None, :],
+                                      dopant_type)) - 1.)
+                    self.max_error = max(self.max_error, np.max(error))
+
+            self.points_per_decade = points_per_decade
+            if self.max_error <= tolerance or \
+                    points_per_decade >= max_points_per_decade:
+                break
+            points_per_decade *= 2
+
+    def _analytic(self, doping, nxc, dopant_type):
+        '''
+        the analytic lifetime for a single dopant type
+        '''
+        Na, Nd = (doping, 0.) if dopant_type == 'p' else (0., doping)
+        ne0, nh0 = get_carriers(Na=Na, Nd=Nd, nxc=0, temp=self.temp,
+                                material=self.material,
+                                ni_author=self.ni_author)
+        return getattr(augmdls, self.model)(
+            self.vals, nxc, ne0, nh0, temp=self.temp)
+
+    def _log_tau(self, log_doping, log_nxc, dopant_type):
+        log_doping, log_nxc = np.broadcast_arrays(log_doping, log_nxc)
+        return np.log10(self._analytic(
+            10**log_doping, 10**log_nxc, dopant_type))
+
+    def tau(self, Na, Nd, nxc):
+        '''
+        Returns the Auger lifetime, using the analytic model for the
+        points outside of the table
+        '''
+        Na = np.asarray(Na, dtype=float)
+        Nd = np.asarray(Nd, dtype=float)
+        nxc = np.atleast_1d(np.asarray(nxc, dtype=float))
+
+        # the usual case, a single doping
+        if Na.ndim == 0 and Nd.ndim == 0:
+            dopant_type = 'p' if Na > Nd else 'n'
+            doping = np.abs(Na - Nd)
+
+            if self.tables is None or doping == 0:
+                return self._analytic(doping, nxc, dopant_type)
+
+            table = self.tables[dopant_type]
+            x = math.log10(doping)
+            y = np.log10(nxc)
+
+            if table.x0 <= x <= table.x1 and \
+                    table.y0 <= y.min() and y.max() <= table.y1:
+                return np.exp(_ln10 * table(x, y))
+
+            inside = table.in_range(x, y)
+
+            tau = self._analytic(doping, nxc, dopant_type)
+            tau[inside] = 10**table(x, y[inside])
+            return tau
+
+        Na, Nd, nxc = np.broadcast_arrays(Na, Nd, nxc)
+
+        p_type = Na > Nd
+        with np.errstate(divide='ignore'):
+            x = np.log10(np.abs(Na - Nd))
+            y = np.log10(nxc)
+
+        tau = np.empty(nxc.shape)
+        for dopant_type, index in (('p', p_type), ('n', ~p_type)):
+            if self.tables is None:
+                outside = index
+            else:
+                table = self.tables[dopant_type]
+                inside = index & table.in_range(x, y)
+                outside = index & ~inside
+                tau[inside] = 10**table(x[inside], y[inside])
+            if np.any(outside):
+                tau[outside] = self._analytic(
+                    np.abs(Na - Nd)[outside], nxc[outside], dopant_type)
+
+        return tau
+
+
+def auger_table(model, vals, author, temp, material='Si', ni_author=None,
+                tolerance=1e-4):
+    '''
+    Returns the AugerTable of a model, shared by all the Auger instances in
+    the process, building it the first time it is asked for. Each table
+    is built once, and different tables can be built at the same time.
+    '''
+    key = (material, author, model, float(temp), ni_author, tolerance)
+
+    with _tables_lock:
+        if key in _tables:
+            _tables.move_to_end(key)
+            return _tables[key]
+        build_lock = _build_locks.setdefault(key, threading.Lock())
+
+    with build_lock:
+        with _tables_lock:
+            if key in _tables:
+                return _tables[key]
+
+        table = AugerTable(model, vals, temp, material=material,
+                           ni_author=ni_author, tolerance=tolerance)
+
+        with _tables_lock:
+            _tables[key] = table
+            _build_locks.pop(key, None)
+            while len(_tables) > _max_tables:
+                _tables.popitem(last=False)
+
+    return table
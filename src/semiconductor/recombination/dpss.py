@@ -0,0 +1,202 @@
+'''
+The defect parameter solution surface (DPSS).
+
+For a defect with energy level Et (from the intrinsic level) and capture
+cross section ratio k = sigma_e / sigma_h the SRH lifetime is linear
+in the electron capture time constant tau_n0:
+
+    tau = tau_n0 * (k * r * A + B)
+
+    A = nxc (ne + ne1) / (ne nh - nieff^2)
+    B = nxc (nh + nh1) / (ne nh - nieff^2)
+
+with r = vth_e / vth_h. So for every (Et, k) point the best tau_n0 of a
+measured curve follows from a linear least squares, minimising the
+relative error sum_i (1 - tau_n0 y_i)^2 with y_i = (k r A_i + B_i) / tau_i:
+
+    tau_n0 = sum(y) / sum(y^2)
+    residual = m - sum(y)^2 / sum(y^2)
+
+As sum(y) and sum(y^2) are polynomials in k, only five sums over the
+injection points are needed per Et, and the whole k axis is then
+evaluated in closed form.
+'''
+
+import numpy as np
+import time
+import scipy.constants as const
+
+from semiconductor.general_functions.carrierfunctions import get_carriers
+from semiconductor.recombination.extrinsic import SRH
+
+
+def prepare_curve(nxc, tau, **kwargs):
+    '''
+    Precalculates the terms of a measured lifetime curve that do not
+    depend on the defect.
+
+    inputs:
+        nxc: (array like |cm-3|)
+            The number of excess carriers
+        tau: (array like s)
+            The measured (SRH) lifetime
+        **kwargs:
+            the calculation details of SRH, i.e. material, temp, Na, Nd,
+            ni_author, vth_author, BGN_author
+
+    output:
+        a dictionary of the curve terms, used by dpss
+    '''
+    nxc = np.asarray(nxc, dtype=float).flatten()
+    tau = np.asarray(tau, dtype=float).flatten()
+    assert nxc.shape == tau.shape, 'nxc and tau must be the same length'
+
+    # SRH provides nieff and the thermal velocities
+    srh = SRH(**kwargs)
+    nieff = np.asarray(srh.nieff, dtype=float).flatten()[0]
+    temp = srh.calculationdetails['temp']
+
+    ne, nh = get_carriers(Na=srh.calculationdetails['Na'],
+                          Nd=srh.calculationdetails['Nd'],
+                          nxc=nxc,
+                          temp=temp,
+                          material=srh.calculationdetails['material'],
+                          ni=nieff)
+
+    denominator = (ne * nh - nieff**2) * tau
+
+    return {
+        'nxc': nxc,
+        'ne': ne,
+        'nh': nh,
+        'nieff': nieff,
+        'kT': const.k * temp / const.e,
+        'a': nxc / denominator,
+        'ratio': float(np.asarray(srh.vel_th_e).flatten()[0] /
+                       np.asarray(srh.vel_th_h).flatten()[0]),
+    }
+
+
+def _dpss_chunk(Et, k, curves):
+    '''
+    Evaluates a chunk of Et values against all the k values.
+
+    output:
+        tau_n0: (array) of shape (n_curves, Et.size, k.size)
+        residual: (array) of shape (n_curves, Et.size, k.size)
+    '''
+    tau_n0 = np.empty((len(curves), Et.size, k.size))
+    residual = np.empty((len(curves), Et.size, k.size))
+
+    for i, curve in enumerate(curves):
+        # the escape from defects, (Et, injection)
+        ne1 = curve['nieff'] * np.exp(Et[:, None] / curve['kT'])
+        nh1 = curve['nieff'] * np.exp(-Et[:, None] / curve['kT'])
+
+        a = curve['a'] * curve['ratio'] * (curve['ne'] + ne1)
+        b = curve['a'] * (curve['nh'] + nh1)
+
+        # the sums over the injection points, (Et, 1)
+        s_a = np.sum(a, axis=1)[:, None]
+        s_b = np.sum(b, axis=1)[:, None]
+        s_aa = np.sum(a * a, axis=1)[:, None]
+        s_ab = np.sum(a * b, axis=1)[:, None]
+        s_bb = np.sum(b * b, axis=1)[:, None]
+
+        s_y = k * s_a + s_b
+        s_yy = k * k * s_aa + 2. * k * s_ab + s_bb
+
+        tau_n0[i] = s_y / s_yy
+        residual[i] = curve['a'].size - s_y * s_y / s_yy
+
+    return tau_n0, residual
+
+
+def dpss(curves, Et, k, max_memory=2**26, max_workers=None):
+    '''
+    Calculates the defect parameter solution surface of one or more
+    measured lifetime curves.
+
+    inputs:
+        curves: (list)
+            of dictionaries from prepare_curve
+        Et: (array like eV)
+            The energy levels from the intrinsic level
+        k: (array like)
+            The capture cross section ratios sigma_e / sigma_h
+        max_memory: (int, bytes)
+            A bound on the memory used by each chunk of Et values
+        max_workers: (int, optional)
+            if given the chunks are evaluated on a process pool of this size
+
+    output:
+        tau_n0: (array s)
+            The best electron capture time constant for each curve, of
+            shape (n_curves, n_Et, n_k)
+        residual: (array)
+            The sum of the relative least squares residual of the curves,
+            of shape (n_Et, n_k)
+    '''
+    Et = np.asarray(Et, dtype=float).flatten()
+    k = np.asarray(k, dtype=float).flatten()
+
+    # the largest arrays of a chunk are the (Et, injection) ones
+    # and the (n_curves, Et, k) outputs
+    n_nxc = max(curve['a'].size for curve in curves)
+    row = 8 * (6 * n_nxc + 6 * len(curves) * k.size)
+    chunk_size = int(max(1, max_memory // row))
+
+    chunks = [Et[i:i + chunk_size] for i in range(0, Et.size, chunk_size)]
+
+    if max_workers is None:
+        results = [_dpss_chunk(chunk, k, curves) for chunk in chunks]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(
+                _dpss_chunk, chunks, [k] * len(chunks),
+                [curves] * len(chunks)))
+
+    tau_n0 = np.concatenate([r[0] for r in results], axis=1)
+    residual = np.sum(np.concatenate([r[1] for r in results], axis=1),
+                      axis=0)
+
+    return tau_n0, residual
+
+
+def benchmark(n_Et=1000, n_k=1000, max_workers=None):
+    '''
+    Times a n_Et by n_k surface for two simulated lifetime curves of a
+    known defect, and checks the defect is found at the minimum of the
+    residual.
+
+    output:
+        a dictionary of the run time (s) and the recovered Et and k
+    '''
+    Et_true, k_true, tau_n0_true = 0.15, 10., 1e-4
+    nxc = np.logspace(13, 16, 30)
+
+    curves = []
+    for details in [dict(Na=1e15, Nd=0, temp=300.),
+                    dict(Na=0, Nd=1e15, temp=300.)]:
+        srh = SRH(**details)
+        r = np.asarray(srh.vel_th_e / srh.vel_th_h).flatten()[0]
+        tau = srh._tau(nxc, tau_n0_true, tau_n0_true * k_true * r, Et_true)
+        curves.append(prepare_curve(nxc, tau, **details))
+
+    Et = np.linspace(-0.55, 0.55, n_Et)
+    k = np.logspace(-3, 3, n_k)
+
+    start = time.perf_counter()
+    tau_n0, residual = dpss(curves, Et, k, max_workers=max_workers)
+    run_time = time.perf_counter() - start
+
+    i, j = np.unravel_index(np.argmin(residual), residual.shape)
+
+    return {
+        'time': run_time,
+        'Et': Et[i],
+        'k': k[j],
+        'tau_n0': tau_n0[:, i, j],
+        'grid': residual.shape,
+    }
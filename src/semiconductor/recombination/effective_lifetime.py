@@ -0,0 +1,209 @@
+import numpy as np
+import scipy.constants as const
+
+from semiconductor.helper.helper import BaseModelClass
+from semiconductor.general_functions.carrierfunctions import get_carriers
+from semiconductor.recombination.intrinsic import Radiative, Auger
+from semiconductor.recombination.extrinsic import SRH
+from semiconductor.recombination import radiative_models as radmdls
+from semiconductor.recombination import auger_models as augmdls
+
+
+class EffectiveLifetime(BaseModelClass):
+    '''
+    Calculates the effective lifetime from radiative, Auger, any number of
+    SRH defects and the surfaces.
+
+    ni, nieff and the equilibrium carrier densities are calculated once,
+    when the material, temperature, doping or a model changes, and are
+    then shared by all the recombination mechanisms.
+
+    inputs:
+        1. material: (str, Si)
+            The elemental name for the material
+        2. temp: (float Kelvin, 300)
+            The temperature of the material in
+        3. Na: (array like |cm-3|)
+            The number of acceptor dopants
+        4. Nd: (array like |cm-3|)
+            The number of donar dopants
+        5. ni_author, rad_author, aug_author, vth_author, BGN_author: (str)
+            Authors for the intrinsic carrier density, radiative and Auger
+            recombination, thermal velocity and band gap narrowing
+        6. defects: (list of str)
+            The SRH defects to include
+        7. Nt: (float or list |cm-3|)
+            The number of each of the defects
+        8. S_front, S_rear: (float cm/s)
+            The surface recombination velocities
+        9. width: (float cm)
+            The sample thickness
+    '''
+
+    _cal_dts = {
+        'material': 'Si',
+        'temp': 300.,
+        'Na': 1,
+        'Nd': 1e16,
+        'ni_author': None,
+        'rad_author': None,
+        'aug_author': None,
+        'vth_author': None,
+        'BGN_author': None,
+        'defects': (),
+        'Nt': 1e10,
+        'S_front': 0.,
+        'S_rear': 0.,
+        'width': 0.018,
+    }
+
+    _link_keys = ('material', 'temp', 'Na', 'Nd', 'ni_author', 'rad_author',
+                  'aug_author', 'vth_author', 'BGN_author', 'defects', 'Nt')
+
+    def __init__(self, **kwargs):
+        # update any values in cal_dts
+        # that are passed
+        self.calculationdetails = kwargs
+        # calculate the shared values
+        self._refresh_links()
+
+    def _update_links(self):
+
+        details = dict(
+            material=self._cal_dts['material'],
+            temp=self._cal_dts['temp'],
+            Na=self._cal_dts['Na'],
+            Nd=self._cal_dts['Nd'],
+        )
+
+        # SRH provides ni, nieff and the thermal velocities
+        self.SRH = SRH(ni_author=self._cal_dts['ni_author'],
+                       vth_author=self._cal_dts['vth_author'],
+                       BGN_author=self._cal_dts['BGN_author'],
+                       Nt=1., **details)
+
+        self.Radiative = Radiative(author=self._cal_dts['rad_author'],
+                                   ni_author=self._cal_dts['ni_author'],
+                                   **details)
+        self.Auger = Auger(author=self._cal_dts['aug_author'],
+                           ni_author=self._cal_dts['ni_author'],
+                           **details)
+
+        self.ni = self.SRH.ni
+        self.nieff = self.SRH.nieff
+
+        # the equilibrium carriers, radiative and Auger are defined
+        # with ni, while SRH uses nieff
+        self._ne0, self._nh0 = get_carriers(
+            nxc=0, ni=self.ni, material=self._cal_dts['material'],
+            Na=self._cal_dts['Na'], Nd=self._cal_dts['Nd'])
+        self._ne0_eff, self._nh0_eff = get_carriers(
+            nxc=0, ni=self.nieff, material=self._cal_dts['material'],
+            Na=self._cal_dts['Na'], Nd=self._cal_dts['Nd'])
+
+        self._Blow, self._rad_terms = self.Radiative._temperature_terms()
+
+        # the defects, along the first axis, each with the thermal velocity
+        # of its own model or the one selected here
+        defects = list(self._cal_dts['defects'])
+        et, tau_e, tau_h = self.SRH._library_params(
+            defects, vth_author=self.SRH.calculationdetails['vth_author'])
+        Nt = (np.ones(len(defects)) * self._cal_dts['Nt']).reshape(
+            (-1,) + (1,) * (tau_e.ndim - 1))
+
+        self._srh = {
+            'et': et,
+            'tau_e': tau_e / Nt,
+            'tau_h': tau_h / Nt,
+        }
+
+    def itau_components(self, nxc, **kwargs):
+        '''
+        Returns the inverse lifetime of each recombination mechanism in
+        s^-1^ for the excess carrier density nxc.
+
+        output:
+            a dictionary of the radiative, Auger, SRH and surface inverse
+            lifetimes. The SRH one has the defects along its first axis.
+        '''
+        self.calculationdetails = kwargs
+        # only recalculates the shared values if they changed
+        self._refresh_links()
+
+        nxc = np.atleast_1d(np.asarray(nxc, dtype=float))
+        temp = self._cal_dts['temp']
+
+        itau_rad = 1. / getattr(radmdls, self.Radiative.model)(
+            vals=self.Radiative.vals, nxc=nxc, nh0=self._nh0, ne0=self._ne0,
+            Blow=self._Blow, temp=temp, terms=self._rad_terms)
+
+        itau_aug = 1. / getattr(augmdls, self.Auger.model)(
+            self.Auger.vals, nxc, self._ne0, self._nh0, temp=temp)
+
+        # the SRH rate of each defect, the defects along the first axis,
+        # and the temperature broadcast against nxc
+        tau_e, tau_h = self._srh['tau_e'], self._srh['tau_h']
+        ndim = max(nxc.ndim, tau_e.ndim - 1)
+        shape = (-1,) + (1,) * (ndim - tau_e.ndim + 1) + tau_e.shape[1:]
+        et = self._srh['et'].reshape((-1,) + (1,) * ndim)
+        kT = const.k * temp / const.e
+
+        ne = self._ne0_eff + nxc
+        nh = self._nh0_eff + nxc
+        ne1 = self.nieff * np.exp(et / kT)
+        nh1 = self.nieff * np.exp(-et / kT)
+
+        itau_srh = (ne * nh - self.nieff**2) / nxc / (
+            tau_h.reshape(shape) * (ne + ne1) +
+            tau_e.reshape(shape) * (nh + nh1))
+
+        itau_surface = (self._cal_dts['S_front'] + self._cal_dts['S_rear']
+                        ) / self._cal_dts['width']
+
+        return {
+            'radiative': itau_rad,
+            'auger': itau_aug,
+            'srh': itau_srh,
+            'surface': itau_surface,
+        }
+
+    def itau(self, nxc, **kwargs):
+        '''
+        Returns the inverse of the effective lifetime in s^-1^
+        '''
+        itau = self.itau_components(nxc, **kwargs)
+
+        return itau['radiative'] + itau['auger'] + \
+            np.sum(itau['srh'], axis=0) + itau['surface']
+
+    def tau(self, nxc, **kwargs):
+        '''
+        Returns the effective lifetime in seconds
+        '''
+        return 1. / self.itau(nxc, **kwargs)
+
+
+def check_srh(vth_author='Bullis_1996', temp=(250., 300., 350.),
+              defects=('Fei_d', 'FeB_a', 'Au_a'), rtol=1e-12):
+    '''
+    Checks the SRH lifetimes of EffectiveLifetime against SRH.tau of each
+    defect, for an array of temperatures and a thermal velocity model that
+    is not the default.
+
+    An AssertionError is raised if any defect differs by more than rtol.
+    '''
+    temp = np.asarray(temp, dtype=float)[:, np.newaxis]
+    nxc = np.logspace(12, 17, 11)
+    details = dict(temp=temp, vth_author=vth_author, Na=1e16, Nd=0,
+                   Nt=1e11)
+
+    itau = EffectiveLifetime(defects=defects, **details).itau_components(
+        nxc)['srh']
+
+    for defect, itau_defect in zip(defects, itau):
+        reference = SRH(defect=defect, **details).tau(nxc=nxc)
+        assert np.allclose(1. / itau_defect, reference, rtol=rtol,
+                           atol=0), (
+            'EffectiveLifetime differs from SRH.tau for {0}'.format(defect))
+
+    return True
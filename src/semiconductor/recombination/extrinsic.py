@@ -3,9 +3,8 @@ import numpy as np
 import sys
 import os
 import scipy.constants as const
-import matplotlib.pylab as plt
 
-from semiconductor.helper.helper import BaseModelClass, class_or_value
+from semiconductor.helper.helper import BaseModelClass, class_or_value, get_pyplot
 from semiconductor.general_functions.carrierfunctions import get_carriers
 from semiconductor.material.intrinsic_carrier_density import IntrinsicCarrierDensity as ni
 from semiconductor.material.thermal_velocity import ThermalVelocity as Vel_th
@@ -63,6 +62,9 @@ class SRH(BaseModelClass):
         'BGN_author': None
     }
 
+    _link_keys = ('material', 'temp', 'ni_author', 'vth_author',
+                  'BGN_author', 'Na', 'Nd')
+
     vel_th_e = None
     vel_th_h = None
 
@@ -83,7 +85,6 @@ class SRH(BaseModelClass):
         self._int_model(author_file)
         # initiate the a defect
         self._change_model(self._cal_dts['defect'])
-        self._update_links()
         self._cal_taun_taup()
 
     def _update_links(self):
@@ -142,8 +143,9 @@ class SRH(BaseModelClass):
         if 'vth_author' in self.vals.keys():
             self._cal_dts['vth_author'] = self.vals['vth_author']
 
-        # get the values from the model
-        self._update_links()
+        # get the values from the model, only rebuilding the links
+        # if the thermal velocity author changed
+        self._refresh_links()
 
     def tau(self, **kwargs):
         '''
@@ -158,13 +160,8 @@ class SRH(BaseModelClass):
             self._change_model(self._cal_dts['defect'])
             self._cal_taun_taup()
 
-        # if change in a model update the values
-        if 'author' in ''.join(kwargs.keys()):
-            self._update_links()
-            self._cal_taun_taup()
-
-        if 'Na' in ''.join(kwargs.keys()) or 'Nd'in ''.join(kwargs.keys()):
-            self._update_links()
+        # if a model, the temperature or the doping changed update the values
+        if self._refresh_links():
             self._cal_taun_taup()
 
         return self._tau(self._cal_dts['nxc'],
@@ -191,7 +188,7 @@ class SRH(BaseModelClass):
         # get the number of carriers
         ne, nh = get_carriers(Na=self._cal_dts['Na'],
                               Nd=self._cal_dts['Nd'],
-                              nxc=self._cal_dts['nxc'],
+                              nxc=nxc,
                               temp=self._cal_dts['temp'],
                               material=self._cal_dts['material'],
                               ni=self.nieff
@@ -201,7 +198,119 @@ class SRH(BaseModelClass):
         U = (ne * nh - self.nieff**2 ) / \
             (tau_h * (ne + ne1) + tau_e * (nh + nh1))
 
-        return self._cal_dts['nxc'] / U
+        return nxc / U
+
+    def tau_library(self, defects=None, **kwargs):
+        '''
+        reports the lifetime of many defects at once for the given
+        excess carrier density. The defect levels and capture cross sections
+        are packed into arrays, so that a single evaluation of the
+        SRH equation is made with ni, the thermal velocity and the carrier
+        densities shared by all the defects.
+
+        inputs:
+            defects: (list, optional)
+                the defects to evaluate, all the available defects if None
+            **kwargs:
+                calculation details, e.g. nxc, Nt, temp, Na or Nd
+
+        output:
+            tau: (array)
+                the lifetime in seconds, with the defects along the first
+                axis and then the broadcast shape of temp and nxc
+            defects: (list)
+                the defect of each row of tau
+        '''
+
+        if bool(kwargs):
+            self.calculationdetails = kwargs
+
+        if defects is None:
+            defects = self.available_models()
+        defects = list(defects)
+
+        # the links are shared by all the defects
+        self._refresh_links()
+
+        et, tau_e, tau_h = self._library_params(defects)
+
+        # the defects go along the first axis, and the temperature
+        # broadcasts against nxc
+        nxc = np.atleast_1d(np.asarray(self._cal_dts['nxc'], dtype=float))
+        ndim = max(nxc.ndim, tau_e.ndim - 1)
+        shape = (len(defects),) + (1,) * (ndim - tau_e.ndim + 1) + \
+            tau_e.shape[1:]
+
+        tau = self._tau(nxc[np.newaxis],
+                        tau_e.reshape(shape),
+                        tau_h.reshape(shape),
+                        et.reshape((len(defects),) + (1,) * ndim))
+
+        return tau, defects
+
+    def _library_params(self, defects, vth_author=None):
+        '''
+        Packs the defect level and the capture time constants of the
+        defects into arrays, for the current links. The time constants have
+        the defects along their first axis and then the shape of the
+        temperature.
+
+        inputs:
+            defects: (list)
+                the defects
+            vth_author: (str, optional)
+                the thermal velocity model used for the defects that do not
+                give their own. If not provided the one in cal_dts is used.
+        '''
+        if vth_author is None:
+            vth_author = self._cal_dts['vth_author']
+
+        temp = np.asarray(self._cal_dts['temp'], dtype=float)
+
+        # each defect uses the thermal velocity model its capture cross
+        # sections were measured with, if it has one
+        vel_th = {}
+
+        et = np.empty(len(defects))
+        sigma_e = np.empty(len(defects))
+        sigma_h = np.empty(len(defects))
+        vel_th_e = np.empty((len(defects),) + temp.shape)
+        vel_th_h = np.empty((len(defects),) + temp.shape)
+
+        for i, defect in enumerate(defects):
+            vals = self.Models[defect]
+
+            author = vals.get('vth_author', vth_author)
+            if author not in vel_th:
+                vels, _ = class_or_value(author, Vel_th, 'update',
+                                         material=self._cal_dts['material'],
+                                         temp=temp)
+                vel_th[author] = [self._temp_shaped(vel, temp)
+                                  for vel in vels]
+
+            et[i] = vals['et']
+            sigma_e[i] = vals.get('sigma_e', np.nan)
+            sigma_h[i] = vals.get('sigma_h', np.nan)
+            vel_th_e[i], vel_th_h[i] = vel_th[author]
+
+        # the cross sections along the first axis
+        shape = (len(defects),) + (1,) * temp.ndim
+        tau_e = 1. / self._cal_dts['Nt'] / sigma_e.reshape(shape) / vel_th_e
+        tau_h = 1. / self._cal_dts['Nt'] / sigma_h.reshape(shape) / vel_th_h
+
+        return et, tau_e, tau_h
+
+    @staticmethod
+    def _temp_shaped(value, temp):
+        '''
+        returns a value that is either a constant or per temperature in the
+        shape of the temperature, e.g. a scalar temperature can give a value
+        of shape (1,)
+        '''
+        value = np.asarray(value, dtype=float)
+        if value.size == temp.size:
+            return value.reshape(temp.shape)
+        return np.broadcast_to(value, temp.shape)
 
     def usr_vals(self, Et=None, sigma_e=None, sigma_h=None,
                  tau_e=None, tau_h=None, Nt=None):
@@ -248,6 +357,7 @@ class SRH(BaseModelClass):
             )
 
     def _plot_all(self):
+        plt = get_pyplot()
         fig, ax = plt.subplots(1, 2, figsize=(16, 6))
         # ax = plt.add_subplot(111)
         counter = 0
@@ -271,3 +381,27 @@ class SRH(BaseModelClass):
         ax[1].loglog()
         ax[1].set_xlabel('$\Delta$ n (cm$^{-3}$)')
         ax[1].set_ylabel('Lifetime (us)')
+
+
+def check_library(vth_author='Bullis_1996', temp=(250., 300., 350.),
+                  rtol=1e-12):
+    '''
+    Checks tau_library against SRH.tau of each defect, for an array of
+    temperatures and a thermal velocity model that is not the default.
+
+    An AssertionError is raised if any defect differs by more than rtol.
+    '''
+    temp = np.asarray(temp, dtype=float)[:, np.newaxis]
+    nxc = np.logspace(12, 17, 11)
+
+    tau, defects = SRH(temp=temp, vth_author=vth_author).tau_library(
+        nxc=nxc)
+
+    for defect, tau_defect in zip(defects, tau):
+        reference = SRH(defect=defect, temp=temp,
+                        vth_author=vth_author).tau(nxc=nxc)
+        assert np.allclose(tau_defect, reference, rtol=rtol, atol=0,
+                           equal_nan=True), (
+            'tau_library differs from SRH.tau for {0}'.format(defect))
+
+    return True
@@ -0,0 +1,328 @@
+import numpy as np
+import scipy.constants as const
+
+from semiconductor.helper.helper import BaseModelClass
+from semiconductor.general_functions.carrierfunctions import get_ni
+from semiconductor.material.bandgap_narrowing import BandGapNarrowing
+from semiconductor.recombination.intrinsic import Radiative, Auger
+
+
+def _equilibrium(doping, ni, dopant_type):
+    '''
+    The equilibrium carrier densities for a single dopant type, and their
+    derivatives with respect to the doping.
+
+    output:
+        ne0, nh0, dne0, dnh0
+    '''
+    root = np.sqrt(doping**2 + 4. * ni**2)
+    maj = 0.5 * (doping + root)
+    dmaj = 0.5 * (1. + doping / root)
+    min_ = ni**2 / maj
+    dmin = -ni**2 / maj**2 * dmaj
+
+    if dopant_type == 'p':
+        return min_, maj, dmin, dmaj
+    return maj, min_, dmaj, dmin
+
+
+class LifetimeModel(BaseModelClass):
+    '''
+    The inverse lifetime of Auger (Richter2012), radiative (with B held
+    fixed) and a number of SRH defects, along with its analytic derivatives,
+    for fitting measured lifetime curves.
+
+    The parameters are passed as a dictionary of arrays that broadcast
+    against (n_curves, 1), so many curves are evaluated at once:
+        doping: the net dopant density (|cm-3|)
+        Et_i: the energy level of defect i from the intrinsic level (eV)
+        tau_n0_i, tau_p0_i: the capture time constants of defect i (s)
+        Nt_i: a multiplier on the number of defect i, by default 1
+
+    inputs:
+        1. material: (str, Si)
+        2. temp: (float Kelvin, 300)
+        3. dopant_type: (str, 'p' or 'n')
+        4. doping: (float |cm-3|)
+            used to find nieff, which is then held fixed
+        5. n_defects: (int)
+            the number of SRH defects
+        6. B: (float, optional)
+            the radiative coefficient, from rad_author's Blow if None
+        7. ni_author, BGN_author, aug_author, rad_author: (str)
+    '''
+
+    _cal_dts = {
+        'material': 'Si',
+        'temp': 300.,
+        'dopant_type': 'p',
+        'doping': 1e16,
+        'n_defects': 1,
+        'B': None,
+        'ni_author': None,
+        'BGN_author': None,
+        'aug_author': 'Richter2012',
+        'rad_author': None,
+    }
+
+    _link_keys = ('material', 'temp', 'dopant_type', 'doping', 'B',
+                  'ni_author', 'BGN_author', 'aug_author', 'rad_author')
+
+    def __init__(self, **kwargs):
+        self.calculationdetails = kwargs
+        self._refresh_links()
+
+    def _update_links(self):
+
+        details = dict(material=self._cal_dts['material'],
+                       temp=self._cal_dts['temp'])
+
+        self.ni = float(np.asarray(get_ni(
+            author=self._cal_dts['ni_author'], **details)).flatten()[0])
+
+        Na, Nd = self._cal_dts['doping'], 0.
+        if self._cal_dts['dopant_type'] == 'n':
+            Na, Nd = Nd, Na
+
+        mult = BandGapNarrowing(
+            author=self._cal_dts['BGN_author'], **details).ni_multiplier(
+            Na=Na, Nd=Nd, nxc=0)
+        self.nieff = self.ni * float(np.asarray(mult).flatten()[0])
+
+        auger = Auger(author=self._cal_dts['aug_author'], **details)
+        if auger.model != 'coulomb_enhanced_auger_Richter':
+            raise ValueError(
+                'Analytic derivatives are only available for the Richter '
+                'Auger model, not {0}'.format(auger.model))
+        self.auger_vals = auger.vals
+
+        if self._cal_dts['B'] is None:
+            self.B = float(np.asarray(Radiative(
+                author=self._cal_dts['rad_author'], **details
+            )._get_Blow()).flatten()[0])
+        else:
+            self.B = self._cal_dts['B']
+
+        self.kT = const.k * self._cal_dts['temp'] / const.e
+
+    @property
+    def parameter_names(self):
+        names = ['doping']
+        for i in range(self._cal_dts['n_defects']):
+            names += ['Et_{0}'.format(i), 'tau_n0_{0}'.format(i),
+                      'tau_p0_{0}'.format(i), 'Nt_{0}'.format(i)]
+        return names
+
+    def itau(self, params, nxc):
+        '''
+        Returns the inverse lifetime in s^-1^ for the parameters
+        '''
+        return self.itau_jacobian(params, nxc, derivatives=False)[0]
+
+    def itau_jacobian(self, params, nxc, derivatives=True):
+        '''
+        Returns the inverse lifetime and a dictionary of its derivatives
+        with respect to each of the parameters.
+        '''
+        self._refresh_links()
+
+        nxc = np.asarray(nxc, dtype=float)
+        doping = np.asarray(params['doping'], dtype=float)
+        tpe = self._cal_dts['dopant_type']
+        vals = self.auger_vals
+
+        # the intrinsic recombination uses ni
+        ne0, nh0, dne0, dnh0 = _equilibrium(doping, self.ni, tpe)
+        carriers = ne0 + nh0 + nxc
+
+        # radiative, (ne nh - ne0 nh0) / nxc = ne0 + nh0 + nxc
+        itau = self.B * carriers
+        d_doping = self.B * (dne0 + dnh0)
+
+        # Auger, Richter
+        u_e = (ne0 / vals['K_eeh'])**vals['n_eeh']
+        u_h = (nh0 / vals['K_ehh'])**vals['p_ehh']
+        g_eeh = 1. + vals['L_eeh'] * (1. - np.tanh(u_e))
+        g_ehh = 1. + vals['L_ehh'] * (1. - np.tanh(u_h))
+
+        C = vals['K_n'] * g_eeh * ne0 + vals['K_p'] * g_ehh * nh0 + \
+            vals['K_delta'] * nxc**vals['delta']
+
+        # d(g ne0) / dne0 = g - L n u sech^2(u)
+        dC = vals['K_n'] * dne0 * (
+            g_eeh - vals['L_eeh'] * vals['n_eeh'] * u_e /
+            np.cosh(u_e)**2) + vals['K_p'] * dnh0 * (
+            g_ehh - vals['L_ehh'] * vals['p_ehh'] * u_h /
+            np.cosh(u_h)**2)
+
+        itau = itau + carriers * C
+        d_doping = d_doping + (dne0 + dnh0) * C + carriers * dC
+
+        # SRH uses nieff
+        ne0, nh0, dne0, dnh0 = _equilibrium(doping, self.nieff, tpe)
+        ne, nh = ne0 + nxc, nh0 + nxc
+        F = ne0 + nh0 + nxc
+
+        jacobian = {}
+        for i in range(self._cal_dts['n_defects']):
+            Et = np.asarray(params['Et_{0}'.format(i)], dtype=float)
+            tn = np.asarray(params['tau_n0_{0}'.format(i)], dtype=float)
+            tp = np.asarray(params['tau_p0_{0}'.format(i)], dtype=float)
+            Nt = np.asarray(params.get('Nt_{0}'.format(i), 1.), dtype=float)
+
+            ne1 = self.nieff * np.exp(Et / self.kT)
+            nh1 = self.nieff * np.exp(-Et / self.kT)
+
+            D = tp * (ne + ne1) + tn * (nh + nh1)
+            itau_srh = Nt * F / D
+            itau = itau + itau_srh
+
+            if derivatives:
+                common = -itau_srh / D
+                jacobian['Et_{0}'.format(i)] = common * (
+                    tp * ne1 - tn * nh1) / self.kT
+                jacobian['tau_n0_{0}'.format(i)] = common * (nh + nh1)
+                jacobian['tau_p0_{0}'.format(i)] = common * (ne + ne1)
+                jacobian['Nt_{0}'.format(i)] = F / D
+                d_doping = d_doping + Nt * (dne0 + dnh0) / D + \
+                    common * (tp * dne0 + tn * dnh0)
+
+        jacobian['doping'] = d_doping
+
+        return itau, jacobian
+
+    def residuals(self, params, nxc, tau):
+        '''
+        The relative residuals tau * itau_model - 1. NaN values of tau,
+        e.g. padding of curves with fewer points, give zero residuals.
+        '''
+        tau = np.asarray(tau, dtype=float)
+        return np.nan_to_num(tau * self.itau(params, nxc) - 1.)
+
+    def jacobian(self, params, nxc, tau, free=None):
+        '''
+        The derivatives of the residuals with respect to the free
+        parameters, of shape (..., n_nxc, n_free)
+        '''
+        free = free or self.parameter_names
+        tau = np.nan_to_num(np.asarray(tau, dtype=float))
+        itau, jacobian = self.itau_jacobian(params, nxc)
+
+        return np.stack(
+            [tau * np.broadcast_to(jacobian[name], itau.shape)
+             for name in free], axis=-1)
+
+    def fit(self, nxc, tau, guess, free=None, **kwargs):
+        '''
+        Fits a single lifetime curve.
+
+        inputs:
+            nxc, tau: (array like)
+                the measured curve
+            guess: (dict)
+                the starting value of all the parameters
+            free: (list, optional)
+                the parameters to fit, all but the Nt_i if None
+            **kwargs:
+                passed to scipy.optimize.least_squares
+
+        output:
+            a dictionary of the fitted parameters, with the cost and
+            whether the fit converged
+        '''
+        from scipy.optimize import least_squares
+
+        if free is None:
+            free = [name for name in self.parameter_names
+                    if not name.startswith('Nt_')]
+
+        nxc = np.asarray(nxc, dtype=float)
+        tau = np.asarray(tau, dtype=float)
+        params = {name: float(value) for name, value in guess.items()}
+
+        # the positive parameters are fitted as their log10
+        log = np.array([not name.startswith('Et_') for name in free])
+
+        def to_params(x):
+            values = np.where(log, 10**x, x)
+            params.update(zip(free, values))
+            return params
+
+        def fun(x):
+            return self.residuals(to_params(x), nxc, tau)
+
+        def jac(x):
+            values = np.where(log, np.log(10.) * 10**x, 1.)
+            return self.jacobian(to_params(x), nxc, tau, free) * values
+
+        x0 = np.array([params[name] for name in free])
+        x0 = np.where(log, np.log10(np.abs(x0)), x0)
+
+        # keep the levels in the band gap and the rest finite
+        kwargs.setdefault('bounds', (np.where(log, -15., -0.6),
+                                     np.where(log, 25., 0.6)))
+        kwargs.setdefault('x_scale', 'jac')
+        x0 = np.clip(x0, *kwargs['bounds'])
+        result = least_squares(fun, x0, jac=jac, **kwargs)
+
+        fitted = dict(to_params(result.x))
+        fitted['cost'] = result.cost
+        fitted['success'] = result.success
+
+        return fitted
+
+    def fit_batch(self, nxc, tau, guesses, free=None, max_workers=None,
+                  **kwargs):
+        '''
+        Fits many lifetime curves, e.g. every point of a wafer map.
+
+        inputs:
+            nxc, tau: (array like)
+                of shape (n_curves, n_nxc), NaN padded
+            guesses: (dict or list of dicts)
+                the starting values, one for all or one for each curve
+            free: (list, optional)
+                the parameters to fit
+            max_workers: (int, optional)
+                if given the curves are fitted on a process pool
+
+        output:
+            a list of fitted parameter dictionaries, one per curve
+        '''
+        nxc = np.atleast_2d(np.asarray(nxc, dtype=float))
+        tau = np.atleast_2d(np.asarray(tau, dtype=float))
+        nxc = np.broadcast_to(nxc, tau.shape)
+
+        if isinstance(guesses, dict):
+            guesses = [guesses] * tau.shape[0]
+
+        if max_workers is None:
+            return _fit_chunk(self, nxc, tau, guesses, free, kwargs)
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        # the workers rebuild the model from its calculation details
+        chunks = np.array_split(np.arange(tau.shape[0]), max_workers * 4)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(
+                _fit_chunk, dict(self._cal_dts), nxc[index], tau[index],
+                [guesses[i] for i in index], free, kwargs)
+                for index in chunks if index.size]
+
+            return [fit for future in futures for fit in future.result()]
+
+
+def _fit_chunk(model, nxc, tau, guesses, free, kwargs):
+    '''
+    fits a chunk of curves, building the model if it was passed as its
+    calculation details
+    '''
+    if isinstance(model, dict):
+        model = LifetimeModel(**model)
+
+    fits = []
+    for i in range(tau.shape[0]):
+        keep = np.isfinite(tau[i]) & np.isfinite(nxc[i])
+        fits.append(model.fit(nxc[i][keep], tau[i][keep], guesses[i],
+                              free, **kwargs))
+    return fits
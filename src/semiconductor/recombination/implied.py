@@ -0,0 +1,248 @@
+import numpy as np
+import scipy.constants as const
+
+from semiconductor.helper.helper import BaseModelClass
+from semiconductor.general_functions.carrierfunctions import get_carriers
+from semiconductor.general_functions.carrierfunctions import get_ni
+from semiconductor.material.bandgap_narrowing import BandGapNarrowing
+from semiconductor.recombination.intrinsic import Intrinsic
+
+
+class Implied(BaseModelClass):
+    '''
+    Extracts the implied open circuit voltage, the recombination current
+    density prefactor J0 and pseudo JV curves from measured lifetimes.
+
+    Many wafers are handled at once: nxc and tau are of shape
+    (wafers, nxc), and the doping and width can be given per wafer, as
+    arrays of shape (wafers,). ni is found once per temperature, and the
+    carrier densities and nieff once per call, and are shared by all the
+    quantities.
+
+    inputs:
+        1. material: (str, Si)
+        2. temp: (float Kelvin, 300)
+        3. Na, Nd: (array like |cm-3|)
+            The number of acceptor and donar dopants
+        4. width: (array like cm)
+            The sample thickness
+        5. Jsc: (float A/cm^2)
+            The short circuit current density at one sun, used for the
+            pseudo JV curves
+        6. ni_author, BGN_author, rad_author, aug_author: (str)
+    '''
+
+    _cal_dts = {
+        'material': 'Si',
+        'temp': 300.,
+        'Na': 1,
+        'Nd': 1e16,
+        'width': 0.018,
+        'Jsc': 0.043,
+        'ni_author': None,
+        'BGN_author': None,
+        'rad_author': None,
+        'aug_author': None,
+    }
+
+    _link_keys = ('material', 'temp', 'ni_author', 'BGN_author',
+                  'rad_author', 'aug_author')
+
+    # the incident power at one sun, W/cm^2
+    _one_sun = 0.1
+
+    def __init__(self, **kwargs):
+        self.calculationdetails = kwargs
+        self._refresh_links()
+
+    def _update_links(self):
+
+        details = dict(material=self._cal_dts['material'],
+                       temp=self._cal_dts['temp'])
+
+        self.ni = get_ni(author=self._cal_dts['ni_author'], **details)
+        self.BGN = BandGapNarrowing(author=self._cal_dts['BGN_author'],
+                                    **details)
+        self.Intrinsic = Intrinsic(ni_author=self._cal_dts['ni_author'],
+                                   rad_author=self._cal_dts['rad_author'],
+                                   aug_author=self._cal_dts['aug_author'],
+                                   **details)
+        self.Vt = const.k * self._cal_dts['temp'] / const.e
+
+    def _per_wafer(self, value, nxc):
+        '''
+        puts values given per wafer along the first axis of nxc
+        '''
+        value = np.asarray(value, dtype=float)
+        if value.ndim == 1 and nxc.ndim == 2:
+            value = value[:, None]
+        return value
+
+    def _carriers(self, nxc, **kwargs):
+        '''
+        Returns nxc, Na, Nd, the carrier densities and nieff, for the
+        current calculation details
+        '''
+        self.calculationdetails = kwargs
+        self._refresh_links()
+
+        nxc = np.atleast_1d(np.asarray(nxc, dtype=float))
+        Na = self._per_wafer(self._cal_dts['Na'], nxc)
+        Nd = self._per_wafer(self._cal_dts['Nd'], nxc)
+
+        ne, nh = get_carriers(Na=Na, Nd=Nd, nxc=nxc, ni=self.ni,
+                              material=self._cal_dts['material'])
+        nieff = self.BGN.ni_eff(self.ni, Na=Na, Nd=Nd, nxc=nxc,
+                                temp=self._cal_dts['temp'])
+
+        return nxc, Na, Nd, ne, nh, nieff
+
+    def iVoc(self, nxc, **kwargs):
+        '''
+        Returns the implied open circuit voltage in V
+        '''
+        nxc, Na, Nd, ne, nh, nieff = self._carriers(nxc, **kwargs)
+        return self.Vt * np.log(ne * nh / nieff**2)
+
+    def J0(self, nxc, tau, nxc_range=None, intrinsic=True, **kwargs):
+        '''
+        Finds the recombination current density prefactor of the surfaces,
+        from the slope of
+
+            1/tau - 1/tau_intrinsic = 1/tau_bulk +
+                2 J0 (ne nh - nieff^2) / (q W nieff^2 nxc)
+
+        which is fitted to each curve by least squares.
+
+        inputs:
+            nxc, tau: (array like)
+                of shape (nxc,) or (wafers, nxc), NaN padded
+            nxc_range: (tuple, optional)
+                the smallest and largest nxc used in the fit
+            intrinsic: (bool)
+                if the intrinsic recombination is first removed
+
+        output:
+            J0: (array A/cm^2)
+                for each surface, of shape (wafers,)
+            tau_bulk: (array s)
+                the lifetime from the intercept, of shape (wafers,)
+        '''
+        nxc, Na, Nd, ne, nh, nieff = self._carriers(nxc, **kwargs)
+        tau = np.asarray(tau, dtype=float)
+
+        itau = 1. / tau
+        if intrinsic:
+            itau = itau - self.Intrinsic.itau(nxc, Na=Na, Nd=Nd)
+
+        x = (ne * nh - nieff**2) / (nieff**2 * nxc)
+        x, itau = np.broadcast_arrays(x, itau)
+
+        use = np.isfinite(x) & np.isfinite(itau)
+        if nxc_range is not None:
+            use &= (nxc >= nxc_range[0]) & (nxc <= nxc_range[1])
+
+        # a least squares line through each row, ignoring unused points
+        n = np.sum(use, axis=-1)
+        x = np.where(use, x, 0.)
+        itau = np.where(use, itau, 0.)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_mean = np.sum(x, axis=-1) / n
+            y_mean = np.sum(itau, axis=-1) / n
+            dx = np.where(use, x - x_mean[..., None], 0.)
+            slope = np.sum(dx * itau, axis=-1) / np.sum(dx**2, axis=-1)
+            tau_bulk = 1. / (y_mean - slope * x_mean)
+
+        width = np.asarray(self._cal_dts['width'], dtype=float)
+        J0 = slope * const.e * width / 2.
+
+        return J0, tau_bulk
+
+    def pseudo_jv(self, nxc, tau, **kwargs):
+        '''
+        Returns the pseudo JV curve, that is without series resistance,
+        from the lifetime. The current is the short circuit current less
+        the current that recombines in the sample at each nxc.
+
+        output:
+            V: (array V)
+                the implied voltage
+            J: (array A/cm^2)
+                the current density
+        '''
+        nxc, Na, Nd, ne, nh, nieff = self._carriers(nxc, **kwargs)
+        tau = np.asarray(tau, dtype=float)
+
+        V = self.Vt * np.log(ne * nh / nieff**2)
+        width = self._per_wafer(self._cal_dts['width'], nxc)
+        J = self._cal_dts['Jsc'] - const.e * width * nxc / tau
+
+        return V, J
+
+    def efficiency(self, nxc, tau, **kwargs):
+        '''
+        Returns the pseudo efficiency, the maximum power point of the
+        pseudo JV curve at one sun. nxc should span the maximum power
+        point, which is usually a little below the open circuit nxc.
+        '''
+        V, J = self.pseudo_jv(nxc, tau, **kwargs)
+        return np.nanmax(V * J, axis=-1) / self._one_sun
+
+    def intrinsic_limit(self, nxc=None, **kwargs):
+        '''
+        Returns the efficiency limit from intrinsic recombination alone, for
+        the doping, width and short circuit current density
+        '''
+        if nxc is None:
+            nxc = np.logspace(13, 17, 400)
+
+        self.calculationdetails = kwargs
+        self._refresh_links()
+
+        nxc = np.atleast_1d(np.asarray(nxc, dtype=float))
+
+        # the same range of nxc for each wafer
+        wafers = [np.size(self._cal_dts[key]) for key in ('Na', 'Nd', 'width')
+                  if np.ndim(self._cal_dts[key]) == 1]
+        if nxc.ndim == 1 and wafers:
+            nxc = np.broadcast_to(nxc, (max(wafers), nxc.size))
+
+        tau = self.Intrinsic.tau(
+            nxc, Na=self._per_wafer(self._cal_dts['Na'], nxc),
+            Nd=self._per_wafer(self._cal_dts['Nd'], nxc))
+
+        return self.efficiency(nxc, tau)
+
+    def stream(self, batches, nxc_range=None, **kwargs):
+        '''
+        Processes batches of measurements as they arrive, e.g. read from a
+        file or an instrument, so the whole line never needs to be in
+        memory.
+
+        inputs:
+            batches: (iterable)
+                of dictionaries with nxc and tau, and optionally Na, Nd
+                and width, for a batch of wafers
+            nxc_range: (tuple, optional)
+                passed to J0
+
+        yields:
+            a dictionary of iVoc at the largest nxc, J0, tau_bulk and the
+            pseudo efficiency of each wafer in the batch
+        '''
+        for batch in batches:
+            batch = dict(batch)
+            nxc = np.atleast_2d(np.asarray(batch.pop('nxc'), dtype=float))
+            tau = np.atleast_2d(np.asarray(batch.pop('tau'), dtype=float))
+            details = dict(kwargs, **batch)
+
+            J0, tau_bulk = self.J0(nxc, tau, nxc_range=nxc_range, **details)
+            V, J = self.pseudo_jv(nxc, tau, **details)
+
+            yield {
+                'iVoc': np.nanmax(np.where(np.isfinite(tau), V, np.nan),
+                                  axis=-1),
+                'J0': J0,
+                'tau_bulk': tau_bulk,
+                'efficiency': np.nanmax(V * J, axis=-1) / self._one_sun,
+            }
@@ -1,13 +1,21 @@
 
 import numpy as np
-import matplotlib.pylab as plt
 import os
 import configparser
+import threading
+from collections import OrderedDict
 
-from semiconductor.helper.helper import BaseModelClass, change_model
+from semiconductor.helper.helper import BaseModelClass, change_model, get_pyplot
 from semiconductor.general_functions.carrierfunctions import get_carriers
 from semiconductor.recombination import radiative_models as radmdls
 from semiconductor.recombination import auger_models as augmdls
+from semiconductor.recombination.auger_tables import auger_table
+
+# Blow and the screening terms of the radiative models, for each
+# (material, author, temperature), for the most recently used ones
+_temperature_cache = OrderedDict()
+_max_temperature_cache = 256
+_temperature_lock = threading.Lock()
 
 
 class Intrinsic(BaseModelClass):
@@ -44,12 +52,14 @@ class Intrinsic(BaseModelClass):
         'Nd': 1e16,
     }
 
+    _link_keys = ('material', 'ni_author', 'rad_author', 'aug_author')
+
     def __init__(self, **kwargs):
         # update any values in cal_dts
         # that are passed
         self.calculationdetails = kwargs
         # pass values to models
-        self._update_links()
+        self._refresh_links()
 
     def _update_links(self):
 
@@ -82,8 +92,8 @@ class Intrinsic(BaseModelClass):
         Returns the inverse of the intrinsic carrier lifetime in s^-1^
         '''
         self.calculationdetails = kwargs
-        if 'author' in ''.join(kwargs.keys()):
-            self._update_links()
+        # only rebuilds the models if an author or material changed
+        self._refresh_links()
 
         itau = self.Radiative.itau(nxc, **kwargs) +\
             self.Auger.itau(nxc, **kwargs)
@@ -107,6 +117,9 @@ class Radiative(BaseModelClass):
         'Nd': 1e16,
     }
 
+    # the equilibrium carriers are kept until one of these changes
+    _link_keys = ('material', 'temp', 'Na', 'Nd', 'ni_author')
+
     def __init__(self, **kwargs):
 
         # update any values in cal_dts
@@ -124,27 +137,37 @@ class Radiative(BaseModelClass):
 
         # initiate the first model
         self.change_model(self._cal_dts['author'])
+        self._refresh_links()
 
-    def tau(self, nxc, **kwargs):
-        '''
-        Returns the intrinsic carrier lifetime in seconds
-        '''
-        self.calculationdetails = kwargs
-        self.change_model(self._cal_dts['author'])
+    def _update_links(self):
 
-        ne0, nh0 = get_carriers(
+        self._ne0, self._nh0 = get_carriers(
             Na=self._cal_dts['Na'],
             Nd=self._cal_dts['Nd'],
             nxc=0,
             ni_author=self._cal_dts['ni_author'],
-            temp=self._cal_dts['temp']
+            temp=self._cal_dts['temp'],
+            material=self._cal_dts['material'],
         )
 
-        Blow = self._get_Blow()
+    def tau(self, nxc, **kwargs):
+        '''
+        Returns the intrinsic carrier lifetime in seconds
+        '''
+        self.calculationdetails = kwargs
+
+        # a check to make sure the model hasn't changed
+        if 'author' in kwargs.keys():
+            self.change_model(self._cal_dts['author'])
+
+        # only recalculates the carriers if the sample changed
+        self._refresh_links()
+
+        Blow, terms = self._temperature_terms()
 
         return getattr(radmdls, self.model)(
-            vals=self.vals, nxc=nxc, nh0=nh0, ne0=ne0,
-            Blow=Blow, temp=self._cal_dts['temp']
+            vals=self.vals, nxc=nxc, nh0=self._nh0, ne0=self._ne0,
+            Blow=Blow, temp=self._cal_dts['temp'], terms=terms
         )
 
     def itau(self, nxc, **kwargs):
@@ -154,49 +177,128 @@ class Radiative(BaseModelClass):
         return 1. / self.tau(nxc, **kwargs)
 
     def get_B(self, nxc, **kwargs):
+        '''
+        Returns the radiative recombination coefficient in cm^3 s^-1^.
+        nxc, Na, Nd and temp follow numpy's broadcasting rules.
+        '''
         self.calculationdetails = kwargs
 
-        if 'b_model' in self.vals.keys():
-            vals, model, author = change_model(
-                self.Models, self.vals['blow_vals'])
+        # a check to make sure the model hasn't changed
+        if 'author' in kwargs.keys():
+            self.change_model(self._cal_dts['author'])
+
+        Blow, terms = self._temperature_terms()
 
-            doping = abs(self._cal_dts['Na'] - self._cal_dts['Nd'])
+        if 'b_model' in self.vals.keys():
+            doping = np.abs(np.asarray(self._cal_dts['Na'], dtype=float) -
+                            np.asarray(self._cal_dts['Nd'], dtype=float))
 
-            Blow = self._get_Blow()
             B = getattr(radmdls, self.vals['b_model'])(
                 self.vals, nxc=nxc, doping=doping,
-                temp=self._cal_dts['temp'], Blow=Blow
+                temp=self._cal_dts['temp'], Blow=Blow, terms=terms
             )
 
         else:
-            B = self._get_Blow()
+            B = Blow
+
+        return B
+
+    def get_B_grid(self, nxc, doping, temp, **kwargs):
+        '''
+        Returns the radiative recombination coefficient over a grid of
+        excess carrier densities, net dopings and temperatures. The
+        calculation details of the instance are left as they were.
+
+        output:
+            B: (array cm^3 s^-1^)
+                of shape (temp, doping, nxc)
+        '''
+        nxc = np.atleast_1d(np.asarray(nxc, dtype=float))
+        doping = np.atleast_1d(np.asarray(doping, dtype=float))
+        temp = np.atleast_1d(np.asarray(temp, dtype=float))
+
+        previous = dict(self._cal_dts)
+
+        B = np.empty((temp.size, doping.size, nxc.size))
+        try:
+            for i, T in enumerate(temp):
+                # the temperature terms come from the cache
+                B[i] = self.get_B(nxc[None, :], Na=doping[:, None], Nd=0.,
+                                  temp=T, **kwargs)
+        finally:
+            self._cal_dts.update(previous)
+            if 'author' in kwargs:
+                self.change_model(self._cal_dts['author'])
 
         return B
 
     def _get_Blow(self):
+        return self._temperature_terms()[0]
+
+    def _temperature_terms(self):
+        '''
+        Returns Blow and the temperature dependent terms of the b_model, or
+        None if there is no b_model. These only depend on the model and the
+        temperature, so for a single temperature they are cached and shared
+        by all the instances.
+        '''
+        temp = self._cal_dts['temp']
+        if np.ndim(temp) != 0:
+            return self._calculate_temperature_terms(temp)
+
+        key = (self._cal_dts['material'], self._cal_dts['author'],
+               float(temp))
+
+        with _temperature_lock:
+            if key in _temperature_cache:
+                _temperature_cache.move_to_end(key)
+                return _temperature_cache[key]
+
+        terms = self._calculate_temperature_terms(float(temp))
+
+        with _temperature_lock:
+            _temperature_cache[key] = terms
+            while len(_temperature_cache) > _max_temperature_cache:
+                _temperature_cache.popitem(last=False)
+        return terms
+
+    def _calculate_temperature_terms(self, temp):
 
         # if there is a model for blow, apply it
         if 'blow_model' in self.vals.keys():
             vals, model, author = change_model(
                 self.Models, self.vals['blow_vals'])
 
-            B = getattr(radmdls, self.vals['blow_model'])(
-                vals, self._cal_dts['temp']
-            )
+            Blow = getattr(radmdls, self.vals['blow_model'])(vals, temp)
 
         # else use the constant value
         else:
-            B = self.vals['blow']
-        return B
+            Blow = self.vals['blow']
+
+        terms = None
+        if self.vals.get('b_model') == 'Roosbroeck_with_screening_B':
+            terms = radmdls.screening_temperature_terms(self.vals, temp)
+
+        return Blow, terms
 
 
 class Auger(BaseModelClass):
     '''
     A class to allows the calculation of different Auger recombiation models
+
+    If tabulated is True the lifetime is interpolated from a table built
+    once per author and temperature, with a relative error below
+    tolerance at the points checked (see auger_tables). This pays off for
+    many calls with a few nxc each, as the carrier densities are not
+    recalculated. Larger arrays always use the model, which numpy
+    evaluates faster per point than the lookup.
     '''
 
     author_list = 'auger.yaml'
 
+    # the largest nxc array that is looked up in the table
+    _table_max_size = 1000
+
     _cal_dts = {
         'material': 'Si',
         'temp': 300.,
@@ -204,6 +306,8 @@ class Auger(BaseModelClass):
         'ni_author': None,
         'Na': 1,
         'Nd': 1e16,
+        'tabulated': False,
+        'tolerance': 1e-4,
     }
 
     def __init__(self, **kwargs):
@@ -233,12 +337,20 @@ class Auger(BaseModelClass):
         if 'author' in kwargs.keys():
             self.change_model(self._cal_dts['author'])
 
+        # the table is for a single temperature
+        if self._cal_dts['tabulated'] and \
+                np.ndim(self._cal_dts['temp']) == 0 and \
+                np.size(nxc) <= self._table_max_size:
+            return self.table().tau(
+                self._cal_dts['Na'], self._cal_dts['Nd'], nxc)
+
         ne0, nh0 = get_carriers(
             Na=self._cal_dts['Na'],
             Nd=self._cal_dts['Nd'],
             nxc=0,
             ni_author=self._cal_dts['ni_author'],
-            temp=self._cal_dts['temp']
+            temp=self._cal_dts['temp'],
+            material=self._cal_dts['material'],
         )
 
         return getattr(augmdls, self.model)(
@@ -250,7 +362,29 @@ class Auger(BaseModelClass):
         '''
         return 1. / self.tau(nxc, **kwargs)
 
+    def table(self):
+        '''
+        Returns the lifetime table of the current author and temperature.
+        Its max_error attribute is the largest relative error found
+        against the analytic model.
+        '''
+        key = (self.model, self._cal_dts['author'],
+               float(self._cal_dts['temp']), self._cal_dts['material'],
+               self._cal_dts['ni_author'], self._cal_dts['tolerance'])
+
+        # the last table is kept, to skip the shared store on each call
+        if getattr(self, '_table_key', None) != key:
+            self._table = auger_table(
+                self.model, self.vals, self._cal_dts['author'],
+                self._cal_dts['temp'],
+                material=self._cal_dts['material'],
+                ni_author=self._cal_dts['ni_author'],
+                tolerance=self._cal_dts['tolerance'])
+            self._table_key = key
+        return self._table
+
     def check(self, author, fig=None, ax=None):
+        plt = get_pyplot()
         if ax is None:
             fig, ax = plt.subplots(1)
         self.change_model(author, self.Models)
@@ -6,7 +6,7 @@ def none(vals, nxc, **kwargs):
     '''
     Returns an infinite lifetime
     '''
-    return np.ones(nxc.shape[0]) * np.inf
+    return np.ones(np.shape(nxc)) * np.inf
 
 
 def Roosbroeck(vals, nxc, nh0, ne0, Blow, **kwargs):
@@ -17,25 +17,22 @@ def Roosbroeck(vals, nxc, nh0, ne0, Blow, **kwargs):
         background conccentraion of carriers.
     '''
     if np.all(nxc == 0):
-        nxc += 1
+        nxc = nxc + 1
 
     nh = nh0 + nxc
     ne = ne0 + nxc
 
-    print(Blow, ne, nh, ne0, nh0)
-
     R = Blow * (ne * nh - ne0 * nh0)
     # print R
     return nxc / R
 
 
-def Roosbroeck_with_screening_B(vals, nxc, doping, temp, Blow):
+def screening_temperature_terms(vals, temp):
     """
-    This is the roosbroeck model that accounts for many things,
-    such as band gap narrowing.
-    It needs temperature, nxc, doping and Blow to be defined
+    The temperature dependent terms of the screening model, bmin, b1 and
+    b3. These only depend on the temperature so can be calculated once
+    and reused.
     """
-
     bmin = vals['rmax'] + (vals['rmin'] - vals['rmax']) / (
         1. + (temp / vals['r1'])**vals['r2'])
     b1 = (vals['smax'] + (vals['smin'] - vals['smax']) / (
@@ -44,22 +41,35 @@ def Roosbroeck_with_screening_B(vals, nxc, doping, temp, Blow):
                           ) / (
         1. + (temp / vals['w1'])**vals['w2'])) * 2
 
-    # print bmin
+    return bmin, b1, b3
+
+
+def Roosbroeck_with_screening_B(vals, nxc, doping, temp, Blow, terms=None):
+    """
+    This is the roosbroeck model that accounts for many things,
+    such as band gap narrowing.
+    It needs temperature, nxc, doping and Blow to be defined.
+    terms are the output of screening_temperature_terms, if already known.
+    """
+    if terms is None:
+        terms = screening_temperature_terms(vals, temp)
+    bmin, b1, b3 = terms
+
+    carriers = 2. * nxc + doping
 
     B = Blow * (bmin + (vals['bmax'] - bmin) / (
-        1. + ((2. * nxc + doping) / b1
-              )**vals['b2']
-        + ((2. * nxc + doping) / b3)**vals['b4']))
+        1. + (carriers / b1)**vals['b2'] + (carriers / b3)**vals['b4']))
 
     return B
 
 
-def Roosbroeck_with_screening(vals, nxc, nh0, ne0, Blow, temp):
+def Roosbroeck_with_screening(vals, nxc, nh0, ne0, Blow, temp, terms=None):
     """
     This is the roosbroeck model that accounts for many things
     It needs temperature, nxc, doping and blow to be defined
     """
-    B = Roosbroeck_with_screening_B(vals, nxc, np.amax([nh0, ne0]), temp, Blow)
+    B = Roosbroeck_with_screening_B(
+        vals, nxc, np.maximum(nh0, ne0), temp, Blow, terms=terms)
     tau = Roosbroeck(vals, nxc, nh0, ne0, Blow=B)
     return tau
 
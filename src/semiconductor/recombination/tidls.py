@@ -0,0 +1,171 @@
+import numpy as np
+
+from semiconductor.helper.helper import BaseModelClass
+from semiconductor.recombination.effective_lifetime import EffectiveLifetime
+from semiconductor.recombination.extrinsic import SRH
+
+
+class TIDLS(BaseModelClass):
+    '''
+    Temperature and injection dependent lifetime spectroscopy.
+
+    Evaluates the effective lifetime of a sample at a number of
+    temperatures and excess carrier densities in one call. An
+    EffectiveLifetime calculator is kept for each temperature, so ni, the
+    thermal velocities, the band gap narrowing and B_low are only
+    calculated the first time a temperature is used, or when a model or the
+    sample changes.
+
+    inputs:
+        1. temp: (array like Kelvin)
+            the temperatures
+        2. max_workers: (int, optional)
+            if given the temperatures are evaluated on a thread pool of
+            this size
+        3. all the inputs of EffectiveLifetime
+    '''
+
+    _cal_dts = dict(EffectiveLifetime._cal_dts, temp=(300.,),
+                    max_workers=None)
+
+    # everything but the temperature, which selects a calculator instead
+    _link_keys = tuple(key for key in EffectiveLifetime._link_keys
+                       if key != 'temp')
+
+    def __init__(self, **kwargs):
+        self.calculationdetails = kwargs
+        self._refresh_links()
+
+    def _update_links(self):
+        # the sample or a model changed, so start again
+        self._calculators = {}
+
+    def _details(self):
+        '''
+        the calculation details passed to the calculators
+        '''
+        return {key: value for key, value in self._cal_dts.items()
+                if key in EffectiveLifetime._cal_dts and key != 'temp'}
+
+    def calculator(self, temp):
+        '''
+        Returns the EffectiveLifetime calculator for a single temperature
+        '''
+        self._refresh_links()
+        temp = float(temp)
+
+        if temp not in self._calculators:
+            self._calculators[temp] = EffectiveLifetime(
+                temp=temp, **self._details())
+        return self._calculators[temp]
+
+    def _map(self, function, temps, nxc):
+        '''
+        calls function(calculator, nxc) for each temperature, in parallel
+        if max_workers is set. Each temperature has its own calculator, so
+        no calculator is shared between threads.
+        '''
+        details = self._details()
+        calculators = [self.calculator(temp) for temp in temps]
+        for calculator in calculators:
+            # the non linking details, e.g. the surfaces
+            calculator.calculationdetails = details
+
+        if nxc.ndim == 2:
+            nxcs = list(nxc)
+        else:
+            nxcs = [nxc] * len(temps)
+
+        max_workers = self._cal_dts['max_workers']
+        if max_workers is None or len(temps) == 1:
+            return [function(calculator, n)
+                    for calculator, n in zip(calculators, nxcs)]
+
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(function, calculators, nxcs))
+
+    def _inputs(self, nxc, kwargs):
+        self.calculationdetails = kwargs
+        temps = np.atleast_1d(np.asarray(self._cal_dts['temp'], dtype=float))
+        nxc = np.atleast_1d(np.asarray(nxc, dtype=float))
+
+        if nxc.ndim == 2 and nxc.shape[0] != temps.size:
+            raise ValueError(
+                'nxc has {0} rows, but there are {1} temperatures'.format(
+                    nxc.shape[0], temps.size))
+        elif nxc.ndim > 2:
+            raise ValueError('nxc must be of shape (nxc,) or (temp, nxc)')
+
+        return temps, nxc
+
+    def itau_components(self, nxc, **kwargs):
+        '''
+        Returns the inverse lifetime of each recombination mechanism in
+        s^-1^.
+
+        inputs:
+            nxc: (array like |cm-3|)
+                of shape (nxc,), used at every temperature, or
+                (temp, nxc), one row per temperature
+
+        output:
+            a dictionary of the radiative, Auger, SRH and surface inverse
+            lifetimes, of shape (temp, nxc). The SRH one has the defects
+            along its first axis, (defects, temp, nxc).
+        '''
+        temps, nxc = self._inputs(nxc, kwargs)
+
+        results = self._map(
+            lambda calculator, n: calculator.itau_components(n), temps, nxc)
+
+        components = {
+            key: np.stack([result[key] for result in results])
+            for key in ('radiative', 'auger')}
+        components['srh'] = np.stack(
+            [result['srh'] for result in results], axis=1)
+        components['surface'] = results[0]['surface']
+
+        return components
+
+    def itau(self, nxc, **kwargs):
+        '''
+        Returns the inverse of the effective lifetime in s^-1^, of shape
+        (temp, nxc)
+        '''
+        temps, nxc = self._inputs(nxc, kwargs)
+
+        return np.stack(self._map(
+            lambda calculator, n: calculator.itau(n), temps, nxc))
+
+    def tau(self, nxc, **kwargs):
+        '''
+        Returns the effective lifetime in seconds, of shape (temp, nxc)
+        '''
+        return 1. / self.itau(nxc, **kwargs)
+
+
+def check_srh(vth_author='Bullis_1996', temp=(250., 300., 350.),
+              defects=('Fei_d', 'FeB_a', 'Au_a'), max_workers=None,
+              rtol=1e-12):
+    '''
+    Checks the SRH lifetimes of TIDLS against SRH.tau of each defect at each
+    temperature, for a thermal velocity model that is not the default.
+
+    An AssertionError is raised if any defect differs by more than rtol.
+    '''
+    nxc = np.logspace(12, 17, 11)
+    details = dict(vth_author=vth_author, Na=1e16, Nd=0, Nt=1e11)
+
+    itau = TIDLS(temp=temp, defects=defects, max_workers=max_workers,
+                 **details).itau_components(nxc)['srh']
+
+    for defect, itau_defect in zip(defects, itau):
+        for t, itau_temp in zip(temp, itau_defect):
+            reference = SRH(defect=defect, temp=t, **details).tau(nxc=nxc)
+            assert np.allclose(1. / itau_temp, reference, rtol=rtol,
+                               atol=0), (
+                'TIDLS differs from SRH.tau for {0} at {1} K'.format(
+                    defect, t))
+
+    return True
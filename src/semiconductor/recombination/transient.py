@@ -0,0 +1,125 @@
+'''
+The transient decay of the excess carrier density,
+
+    dnxc/dt = G(t) - nxc / tau_eff(nxc)
+
+for many samples at once. The equation is stiff at high injection and
+for short lifetimes, so it is integrated with the two stage Rosenbrock
+method ROS2 (gamma = 1 + 1/sqrt(2)), which is L-stable, with its
+embedded first order solution used to adapt the step of each sample.
+'''
+
+import numpy as np
+
+_gamma = 1. + 1. / np.sqrt(2.)
+
+
+def _rate(model, nxc, t, generation, floor):
+    '''
+    dnxc/dt, with the lifetime evaluated no lower than floor
+    '''
+    itau = model.itau(np.maximum(nxc, floor))
+    rate = -nxc * itau
+    if generation is not None:
+        rate = rate + generation(t)
+    return rate
+
+
+def integrate(model, nxc0, t_eval, generation=None, rtol=1e-4, atol=1e8,
+              floor=1e6, h0=None, max_steps=100000):
+    '''
+    Integrates the excess carrier density of each sample in time, yielding
+    the result at each of the requested times so that the time steps never
+    need to be stored.
+
+    inputs:
+        model:
+            a calculator with an itau(nxc) method that returns the inverse
+            effective lifetime (s^-1), e.g. EffectiveLifetime or Intrinsic
+        nxc0: (array like |cm-3|)
+            the initial excess carrier density of each sample
+        t_eval: (array like s)
+            increasing times at which the carrier density is returned
+        generation: (function, optional)
+            G(t) in |cm-3| s^-1, passed the time of each sample and
+            returning the generation rate of each sample
+        rtol, atol: (float)
+            the relative and absolute (|cm-3|) error per step
+        floor: (float |cm-3|)
+            the lowest carrier density the lifetime is evaluated at
+        h0: (float s, optional)
+            the first step, 1% of the shortest initial lifetime if None
+        max_steps: (int)
+            the number of steps after which the integration stops
+
+    yields:
+        t, nxc:
+            the time and the excess carrier density of each sample
+    '''
+    nxc = np.atleast_1d(np.asarray(nxc0, dtype=float)).copy()
+    t_eval = np.asarray(t_eval, dtype=float)
+
+    t = np.zeros(nxc.shape)
+    f = _rate(model, nxc, t, generation, floor)
+
+    if h0 is None:
+        h0 = 0.01 / np.max(model.itau(np.maximum(nxc, floor)))
+    h = np.ones(nxc.shape) * h0
+
+    steps = 0
+    for target in t_eval:
+
+        while True:
+            active = t < target
+            if not np.any(active):
+                break
+            if steps >= max_steps:
+                raise RuntimeError(
+                    'the integration did not reach {0} s in {1} '
+                    'steps'.format(target, max_steps))
+            steps += 1
+
+            # the steps land on the requested times
+            step = np.where(active, np.minimum(h, target - t), 0.)
+
+            # the derivative of the rate, by a finite difference
+            delta = 1e-6 * np.maximum(nxc, floor)
+            J = (_rate(model, nxc + delta, t, generation, floor) - f) / delta
+
+            W = 1. - _gamma * step * J
+            k1 = f / W
+            k2 = (_rate(model, nxc + step * k1, t + step, generation,
+                        floor) - 2. * k1) / W
+
+            new = np.maximum(nxc + step * (1.5 * k1 + 0.5 * k2), 0.)
+
+            # compare to the embedded first order solution
+            error = np.abs(0.5 * step * (k1 + k2)) / (
+                atol + rtol * np.maximum(np.abs(new), np.abs(nxc)))
+
+            accept = active & (error <= 1.)
+
+            nxc = np.where(accept, new, nxc)
+            t = np.where(accept, t + step, t)
+            f = np.where(accept, _rate(model, nxc, t, generation, floor), f)
+
+            # a first order error estimate, so scale the step by its root
+            scale = np.clip(0.9 / np.sqrt(np.maximum(error, 1e-10)), 0.2, 5.)
+            # steps shortened to land on a time do not shrink the next one
+            h = np.where(active, np.where(accept & (step < h),
+                                          np.maximum(h, step * scale),
+                                          step * scale), h)
+
+        yield target, nxc.copy()
+
+
+def solve(model, nxc0, t_eval, generation=None, **kwargs):
+    '''
+    Integrates the excess carrier density in time, see integrate.
+
+    output:
+        nxc: (array)
+            of shape (t_eval, samples)
+    '''
+    return np.array([nxc for t, nxc in integrate(
+        model, nxc0, t_eval, generation, **kwargs)])